@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from typing import Callable, List, Any, Optional, Tuple
 import time
+import heapq
 
 @dataclass
 class SortMetrics:
@@ -185,6 +186,16 @@ def builtin_timsort(data: List[Any], key: Callable[[Any], Any], reverse: bool=Fa
     # Comparisons/moves not available; leave as None
     return out, SortMetrics("timsort(builtin)", dt, None, None, len(data))
 
+# -------------------------------
+# Partial sort: k best items (heap), O(n log k)
+# -------------------------------
+def top_k(data: List[Any], key: Callable[[Any], Any], k: int, reverse: bool=False) -> Tuple[List[Any], SortMetrics]:
+    t0 = time.perf_counter()
+    pick = heapq.nlargest if reverse else heapq.nsmallest
+    out = pick(max(0, k), data, key=key)
+    dt = (time.perf_counter() - t0) * 1000
+    return out, SortMetrics(f"heap-top{k}", dt, None, None, len(data))
+
 # -------------------------------
 # Search algorithms
 # -------------------------------
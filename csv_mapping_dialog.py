@@ -0,0 +1,56 @@
+# csv_mapping_dialog.py
+# Diálogo de mapeamento de colunas do CSV por URL. Fica separado de csv_url_loader para que o
+# download/conversão não dependam de Tk (testes e CLI importam o loader sem interface).
+import customtkinter as ctk
+from tkinter import messagebox
+from typing import List
+
+class CSVMappingDialog(ctk.CTkToplevel):
+    """Dialog para o usuário mapear colunas do CSV para campos do Flight."""
+    def __init__(self, master, headers: List[str]):
+        super().__init__(master)
+        self.title("Mapear colunas do CSV")
+        self.geometry("520x420")
+        self.resizable(False, False)
+        self.grab_set()
+        self.mapping = None
+
+        fields = [
+            ("flight_id",       "ID do voo (opcional)"),
+            ("airline",         "Companhia (opcional)"),
+            ("origin",          "Origem (IATA)"),
+            ("destination",     "Destino (IATA)"),
+            ("date",            "Data (YYYY-MM[-DD])"),
+            ("depart_time",     "Partida (HH:MM) (opcional)"),
+            ("arrive_time",     "Chegada (HH:MM) (opcional)"),
+            ("duration_min",    "Duração (min) (opcional)"),
+            ("price",           "Preço"),
+        ]
+        self.widgets = {}
+        opts = ["— (vazio) —"] + headers
+        body = ctk.CTkScrollableFrame(self); body.pack(fill="both", expand=True, padx=12, pady=12)
+        for key, label in fields:
+            row = ctk.CTkFrame(body); row.pack(fill="x", pady=6)
+            ctk.CTkLabel(row, text=label, width=220, anchor="w").pack(side="left")
+            cb = ctk.CTkComboBox(row, values=opts, width=240)
+            cb.set("— (vazio) —")
+            cb.pack(side="left")
+            self.widgets[key] = cb
+
+        btns = ctk.CTkFrame(self); btns.pack(fill="x", padx=12, pady=(0,12))
+        ctk.CTkButton(btns, text="OK", command=self._ok).pack(side="right", padx=6)
+        ctk.CTkButton(btns, text="Cancelar", fg_color="gray", command=self._cancel).pack(side="right", padx=6)
+
+    def _ok(self):
+        self.mapping = {k: (w.get() if w.get() != "— (vazio) —" else None) for k, w in self.widgets.items()}
+        # validações mínimas
+        need = ["origin","destination","date","price"]
+        miss = [f for f in need if not self.mapping.get(f)]
+        if miss:
+            messagebox.showerror("Campos obrigatórios", f"Faltam mapear: {', '.join(miss)}"); 
+            return
+        self.destroy()
+
+    def _cancel(self):
+        self.mapping = None
+        self.destroy()
@@ -1,10 +1,13 @@
 # csv_url_loader.py
-import io, csv, requests
-import customtkinter as ctk
-from tkinter import messagebox
-from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+import io, csv, gzip, json, base64, threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Optional, Callable, Iterator, Iterable
 from models import Flight
+import temporal
+from providers import shared_session
+from sketches import PriceStats
+from tracing import TRACER
 
 def _norm_price(x) -> float:
     if x is None: return 0.0
@@ -15,100 +18,26 @@ def _norm_price(x) -> float:
         try: return float(s.replace(",", "."))
         except: return 0.0
 
-def _norm_time(x: Optional[str]) -> str:
-    if not x: return "08:00"
-    s = str(x).strip()
-    # aceita "8", "8:3", "08:30", "0830"
-    if s.isdigit() and len(s) in (3,4):
-        s = s.zfill(4);  return f"{s[:2]}:{s[2:]}"
-    if ":" in s:
-        hh, mm = s.split(":")[:2]
-        hh = hh.zfill(2); mm = mm.zfill(2)
-        return f"{hh}:{mm}"
-    if s.isdigit():
-        return f"{int(s)%24:02d}:00"
-    return "08:00"
-
-def _norm_date(x: Optional[str]) -> str:
-    if not x: return "1970-01-01"
-    s = str(x).strip().replace("/", "-")
-    # tenta YYYY-MM-DD, YYYY-MM, YYYY
-    for fmt in ("%Y-%m-%d", "%Y-%m", "%Y"):
-        try:
-            dt = datetime.strptime(s, fmt)
-            if fmt == "%Y-%m":   return dt.strftime("%Y-%m-01")
-            if fmt == "%Y":      return dt.strftime("%Y-01-01")
-            return dt.strftime("%Y-%m-%d")
-        except: pass
-    # tenta dd-mm-YYYY
-    for fmt in ("%d-%m-%Y", "%d/%m/%Y"):
-        try:
-            dt = datetime.strptime(s, fmt)
-            return dt.strftime("%Y-%m-%d")
-        except: pass
-    return "1970-01-01"
-
-class CSVMappingDialog(ctk.CTkToplevel):
-    """Dialog para o usuário mapear colunas do CSV para campos do Flight."""
-    def __init__(self, master, headers: List[str]):
-        super().__init__(master)
-        self.title("Mapear colunas do CSV")
-        self.geometry("520x420")
-        self.resizable(False, False)
-        self.grab_set()
-        self.mapping = None
-
-        fields = [
-            ("flight_id",       "ID do voo (opcional)"),
-            ("airline",         "Companhia (opcional)"),
-            ("origin",          "Origem (IATA)"),
-            ("destination",     "Destino (IATA)"),
-            ("date",            "Data (YYYY-MM[-DD])"),
-            ("depart_time",     "Partida (HH:MM) (opcional)"),
-            ("arrive_time",     "Chegada (HH:MM) (opcional)"),
-            ("duration_min",    "Duração (min) (opcional)"),
-            ("price",           "Preço"),
-        ]
-        self.widgets = {}
-        opts = ["— (vazio) —"] + headers
-        body = ctk.CTkScrollableFrame(self); body.pack(fill="both", expand=True, padx=12, pady=12)
-        for key, label in fields:
-            row = ctk.CTkFrame(body); row.pack(fill="x", pady=6)
-            ctk.CTkLabel(row, text=label, width=220, anchor="w").pack(side="left")
-            cb = ctk.CTkComboBox(row, values=opts, width=240)
-            cb.set("— (vazio) —")
-            cb.pack(side="left")
-            self.widgets[key] = cb
-
-        btns = ctk.CTkFrame(self); btns.pack(fill="x", padx=12, pady=(0,12))
-        ctk.CTkButton(btns, text="OK", command=self._ok).pack(side="right", padx=6)
-        ctk.CTkButton(btns, text="Cancelar", fg_color="gray", command=self._cancel).pack(side="right", padx=6)
-
-    def _ok(self):
-        self.mapping = {k: (w.get() if w.get() != "— (vazio) —" else None) for k, w in self.widgets.items()}
-        # validações mínimas
-        need = ["origin","destination","date","price"]
-        miss = [f for f in need if not self.mapping.get(f)]
-        if miss:
-            messagebox.showerror("Campos obrigatórios", f"Faltam mapear: {', '.join(miss)}"); 
-            return
-        self.destroy()
-
-    def _cancel(self):
-        self.mapping = None
-        self.destroy()
+# Datas/horas: parsing memoizado compartilhado (ver temporal.py)
+_norm_time = temporal.norm_time
+_norm_date = temporal.norm_date
 
 def _row_get(row: Dict[str, str], col: Optional[str]) -> Optional[str]:
     return None if not col else row.get(col)
 
-def rows_to_flights(rows: List[Dict[str, str]], mapping: Dict[str, Optional[str]]) -> List[Flight]:
+def rows_to_flights(rows: List[Dict[str, str]], mapping: Dict[str, Optional[str]],
+                    stats: Optional[PriceStats] = None, start: int = 1) -> List[Flight]:
     flights: List[Flight] = []
-    for i, r in enumerate(rows, 1):
+    # formato da coluna de data detectado uma vez numa amostra; depois só o caminho rápido
+    date_col = mapping.get("date")
+    parse_date = temporal.date_parser(temporal.detect_date_format(
+        _row_get(r, date_col) for r in rows[:200])) if date_col else _norm_date
+    for i, r in enumerate(rows, start):
         origin  = (_row_get(r, mapping.get("origin")) or "").strip().upper()
         dest    = (_row_get(r, mapping.get("destination")) or "").strip().upper()
         if not origin or not dest: 
             continue
-        date    = _norm_date(_row_get(r, mapping.get("date")))
+        date    = parse_date(_row_get(r, date_col))
         dep     = _norm_time(_row_get(r, mapping.get("depart_time")))
         arr     = _norm_time(_row_get(r, mapping.get("arrive_time")))
         dur_s   = _row_get(r, mapping.get("duration_min"))
@@ -116,13 +45,12 @@ def rows_to_flights(rows: List[Dict[str, str]], mapping: Dict[str, Optional[str]
         except: duration = None
         # recalcula chegada se tiver duração
         if duration is not None:
-            dt = datetime.fromisoformat(f"{date} {dep}:00") + timedelta(minutes=duration)
-            arr = dt.strftime("%H:%M")
+            arr = temporal.add_minutes(dep, duration)
         airline = _row_get(r, mapping.get("airline")) or "N/A"
         price   = _norm_price(_row_get(r, mapping.get("price")))
         fid     = (_row_get(r, mapping.get("flight_id")) or f"CSV-{i}")
 
-        flights.append(Flight(
+        fl = Flight(
             flight_id=fid,
             airline=str(airline),
             origin=origin,
@@ -131,23 +59,397 @@ def rows_to_flights(rows: List[Dict[str, str]], mapping: Dict[str, Optional[str]
             depart_time=dep,
             arrive_time=arr,
             price=price,
-        ))
+        )
+        flights.append(fl)
+        if stats is not None:
+            stats.add(fl)
     return flights
 
-def load_flights_from_url_via_mapping(master, url: str) -> List[Flight]:
-    if not url.lower().startswith(("http://", "https://")):
-        raise ValueError("Informe uma URL iniciando com http(s)://")
-    resp = requests.get(url, timeout=60)
-    resp.raise_for_status()
-    content = resp.content.decode("utf-8", errors="replace")
-    reader = csv.DictReader(io.StringIO(content))
-    if not reader.fieldnames:
-        raise RuntimeError("CSV sem cabeçalho.")
-    headers = [h.strip() for h in reader.fieldnames]
-    rows = [dict(row) for row in reader]
-
-    dlg = CSVMappingDialog(master, headers)
-    master.wait_window(dlg)
-    if dlg.mapping is None:
-        return []
-    return rows_to_flights(rows, dlg.mapping)
+# ---------------- Mapeamento compilado (caminho rápido) ----------------
+def _strip_currency(s: str) -> str:
+    return s.replace("R$", "").replace("US$", "").replace(" ", "")
+
+def _price_plain(s: str) -> float:
+    return float(s)
+
+def _price_plain_currency(s: str) -> float:
+    return float(_strip_currency(s))
+
+def _price_br_plain(s: str) -> float:
+    return float(s.replace(".", "").replace(",", ".")) if "," in s else float(s)
+
+def _price_br(s: str) -> float:
+    return _price_br_plain(_strip_currency(s))
+
+def sniff_price(samples: List[str]) -> Callable[[str], float]:
+    """
+    Escolhe o conversor de preço mais simples que concorda com _norm_price em todas as amostras
+    (ponto decimal ou formato BR '1.234,56', com ou sem símbolo de moeda); senão usa _norm_price.
+    """
+    vals = [v for v in samples if v and v.strip()]
+    for fn in (_price_plain, _price_br_plain, _price_plain_currency, _price_br):
+        try:
+            if vals and all(fn(v) == _norm_price(v) for v in vals):
+                return fn
+        except ValueError:
+            continue
+    return _norm_price
+
+def _duration_int(s: str) -> Optional[int]:
+    return int(s) if s else None
+
+def _duration_float(s: str) -> Optional[int]:
+    return int(float(s.replace(",", "."))) if s else None
+
+class CompiledMapping:
+    """
+    Mapeamento do CSVMappingDialog compilado uma vez para índices de coluna, com um normalizador
+    por coluna escolhido a partir de uma amostra (formato de data, locale do preço, duração).
+    Converte linhas posicionais (csv.reader) sem dicts; preço/duração vazios são tratados no
+    próprio laço e só linhas fora do padrão caem em _slow, sem try/except por linha no caminho comum.
+    """
+    def __init__(self, mapping: Dict[str, Optional[str]], headers: List[str], sample: List[List[str]]):
+        self.mapping = mapping
+        self.headers = headers
+        pos = {h: i for i, h in enumerate(headers)}
+        self.idx = {k: pos.get(col) if col else None for k, col in mapping.items()}
+        for k in ("origin", "destination", "date", "price"):
+            if self.idx.get(k) is None:
+                raise ValueError(f"Coluna não encontrada para '{k}': {mapping.get(k)!r}")
+        col = lambda k: [r[self.idx[k]] for r in sample if self.idx.get(k) is not None and len(r) > self.idx[k]]
+        self.parse_date = temporal.date_parser(temporal.detect_date_format(col("date")))
+        self.parse_price = sniff_price(col("price"))
+        durs = [v.strip() for v in col("duration_min") if v and v.strip()]
+        self.parse_duration = _duration_int if durs and all(v.isdigit() for v in durs) else _duration_float
+
+    def _slow(self, r: List[str], i: int) -> Optional[Flight]:
+        """
+        Linha atípica (coluna faltando, preço/duração fora do formato da amostra): mesmos
+        conversores compilados, com os fallbacks tolerantes de rows_to_flights só no campo que falhou.
+        """
+        ix, n = self.idx, len(r)
+        get = lambda k: r[ix[k]] if ix.get(k) is not None and ix[k] < n else None
+        origin = (get("origin") or "").strip().upper()
+        dest = (get("destination") or "").strip().upper()
+        if not origin or not dest:
+            return None
+        d = get("date")
+        try: date = self.parse_date(d)
+        except (ValueError, TypeError): date = _norm_date(d)
+        dep = _norm_time(get("depart_time"))
+        arr = _norm_time(get("arrive_time"))
+        dur_s = (get("duration_min") or "").strip()
+        try: duration = self.parse_duration(dur_s)
+        except ValueError:
+            try: duration = _duration_float(dur_s)
+            except ValueError: duration = None
+        if duration is not None:
+            arr = temporal.add_minutes(dep, duration)
+        p = get("price")
+        try: price = self.parse_price(p) if p else 0.0
+        except (ValueError, TypeError, AttributeError): price = _norm_price(p)
+        return Flight(get("flight_id") or f"CSV-{i}", get("airline") or "N/A",
+                      origin, dest, date, dep, arr, price)
+
+    def convert(self, rows: Iterable[List[str]], stats: Optional[PriceStats] = None, start: int = 1) -> List[Flight]:
+        ix = self.idx
+        io_, id_, idt, ipr = ix["origin"], ix["destination"], ix["date"], ix["price"]
+        idep, iarr, idur = ix.get("depart_time"), ix.get("arrive_time"), ix.get("duration_min")
+        iair, ifid = ix.get("airline"), ix.get("flight_id")
+        parse_date, parse_price, parse_dur = self.parse_date, self.parse_price, self.parse_duration
+        norm_time, add_minutes = temporal.norm_time, temporal.add_minutes
+        out: List[Flight] = []
+        append = out.append
+        i = start - 1
+        it = iter(rows)
+        while True:
+            try:
+                for r in it:
+                    i += 1
+                    origin = r[io_].strip().upper()
+                    dest = r[id_].strip().upper()
+                    if not origin or not dest:
+                        continue
+                    dep = norm_time(r[idep]) if idep is not None else "08:00"
+                    dur = parse_dur(r[idur].strip()) if idur is not None else None
+                    if dur is not None:
+                        arr = add_minutes(dep, dur)
+                    else:
+                        arr = norm_time(r[iarr]) if iarr is not None else "08:00"
+                    # posicional: flight_id, airline, origin, destination, date, depart, arrive, price
+                    p = r[ipr]
+                    append(Flight(
+                        (r[ifid] if ifid is not None else "") or f"CSV-{i}",
+                        (r[iair] if iair is not None else "") or "N/A",
+                        origin, dest, parse_date(r[idt]), dep, arr, parse_price(p) if p else 0.0,
+                    ))
+                break
+            except (ValueError, IndexError, TypeError):
+                f = self._slow(r, i)      # linha atípica: fallback por campo, sem dicts
+                if f is not None:
+                    append(f)
+        if stats is not None:
+            stats.add_many(out)
+        return out
+
+def compile_mapping(mapping: Dict[str, Optional[str]], headers: List[str],
+                    sample: List[List[str]]) -> CompiledMapping:
+    return CompiledMapping(mapping, headers, sample)
+
+# ---------------- Download em streaming ----------------
+class LoadCancelled(Exception):
+    """Carga interrompida pelo usuário (cancel.set())."""
+
+ProgressFn = Callable[[int, int, Optional[int]], None]   # (linhas, bytes recebidos, total ou None)
+
+TAIL_BYTES = 256      # bytes finais guardados para validar que o arquivo remoto só cresceu
+
+class _ResponseStream(io.RawIOBase):
+    """Expõe resp.iter_content como arquivo binário, contando bytes e checando cancelamento."""
+    def __init__(self, resp, cancel: Optional[threading.Event], chunk: int = 64 * 1024):
+        self._it = resp.iter_content(chunk_size=chunk)      # já desfaz Content-Encoding: gzip
+        self._buf = b""
+        self._cancel = cancel
+        self.bytes_read = 0
+        self.tail = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        if self._cancel is not None and self._cancel.is_set():
+            raise LoadCancelled("Carga cancelada.")
+        while not self._buf:
+            try:
+                self._buf = next(self._it)
+            except StopIteration:
+                return 0
+            self.tail = (self.tail + self._buf)[-TAIL_BYTES:]
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        self.bytes_read += n
+        return n
+
+class _PrefixMismatch(Exception):
+    """O trecho já conhecido do arquivo remoto mudou: não dá para só anexar."""
+
+class CSVStream:
+    """
+    CSV remoto aberto em streaming: cabeçalho disponível assim que chega;
+    as linhas são decodificadas sob demanda (arquivos .gz são descompactados on-the-fly).
+    Com `resp`/`headers`/`expect_prefix`, lê só a cauda de um arquivo já conhecido (HTTP Range).
+    """
+    def __init__(self, url: str, cancel: Optional[threading.Event] = None, timeout: float = 60,
+                 resp=None, headers: Optional[List[str]] = None, expect_prefix: bytes = b""):
+        if not url.lower().startswith(("http://", "https://")):
+            raise ValueError("Informe uma URL iniciando com http(s)://")
+        self.resp = resp if resp is not None else shared_session().get(url, timeout=timeout, stream=True)
+        self.resp.raise_for_status()
+        cl = self.resp.headers.get("Content-Length")
+        self.total_bytes: Optional[int] = int(cl) if cl and cl.isdigit() else None
+        self.etag: Optional[str] = self.resp.headers.get("ETag")
+        self.last_modified: Optional[str] = self.resp.headers.get("Last-Modified")
+        self.rows_read = 0
+        self._raw = _ResponseStream(self.resp, cancel)
+        binary = io.BufferedReader(self._raw, buffer_size=256 * 1024)
+        if expect_prefix and binary.read(len(expect_prefix)) != expect_prefix:
+            self.close()
+            raise _PrefixMismatch()
+        self.gzipped = binary.peek(2)[:2] == b"\x1f\x8b"
+        if self.gzipped:                                # arquivo gzip servido como binário
+            binary = gzip.GzipFile(fileobj=binary)
+        self._text = io.TextIOWrapper(binary, encoding="utf-8", errors="replace", newline="")
+        self.reader = csv.reader(self._text)
+        if headers is not None:
+            self.headers = headers
+            return
+        first = next(self.reader, None)
+        if not first:
+            self.close()
+            raise RuntimeError("CSV sem cabeçalho.")
+        self.headers = [h.strip().lstrip("\ufeff") for h in first]
+
+    @property
+    def bytes_read(self) -> int:
+        return self._raw.bytes_read
+
+    @property
+    def tail(self) -> bytes:
+        return self._raw.tail
+
+    def iter_row_chunks(self, chunk_size: int = 5000) -> Iterator[List[List[str]]]:
+        chunk: List[List[str]] = []
+        for row in self.reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                self.rows_read += len(chunk)
+                yield chunk
+                chunk = []
+        if chunk:
+            self.rows_read += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.resp.close()
+
+def iter_flight_chunks(stream: CSVStream, mapping: Dict[str, Optional[str]], chunk_size: int = 5000,
+                       stats: Optional[PriceStats] = None,
+                       on_progress: Optional[ProgressFn] = None, start: int = 1) -> Iterator[List[Flight]]:
+    """
+    Converte o CSV em blocos de `chunk_size` linhas: memória de pico ~ um bloco, não o arquivo.
+    O mapeamento é compilado com o primeiro bloco como amostra.
+    """
+    done = 0
+    compiled: Optional[CompiledMapping] = None
+    for rows in stream.iter_row_chunks(chunk_size):
+        with TRACER.span("convert_chunk", rows_in=len(rows)) as sp:
+            if compiled is None:
+                compiled = compile_mapping(mapping, stream.headers, rows[:500])
+            flights = compiled.convert(rows, stats, start=start + done)
+            sp.rows_out = len(flights)
+        done += len(rows)
+        if on_progress is not None:
+            on_progress(done, stream.bytes_read, stream.total_bytes)
+        yield flights
+
+# ---------------- Estado por URL (recarga condicional / incremental) ----------------
+class UrlSourceStore:
+    """
+    Estado persistido (JSON) por URL: mapeamento de colunas, cabeçalho, ETag/Last-Modified,
+    bytes já consumidos, últimos bytes (para validar crescimento) e linhas lidas.
+    """
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self._data: Dict[str, dict] = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            self._data = {}
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            st = self._data.get(url)
+            return dict(st) if st else None
+
+    def put(self, url: str, state: dict):
+        with self._lock:
+            self._data[url] = state
+            self.path.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def forget(self, url: str):
+        with self._lock:
+            if self._data.pop(url, None) is not None:
+                self.path.write_text(json.dumps(self._data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+def _remember(store: UrlSourceStore, url: str, stream: CSVStream, mapping: Dict[str, Optional[str]],
+              length: int, rows: int):
+    tail = stream.tail
+    # só dá para anexar depois se o arquivo é texto puro e termina numa quebra de linha
+    appendable = not stream.gzipped and tail.endswith(b"\n")
+    store.put(url, {
+        "mapping": mapping,
+        "headers": stream.headers,
+        "etag": stream.etag,
+        "last_modified": stream.last_modified,
+        "length": length if appendable else None,
+        "tail": base64.b64encode(tail).decode("ascii") if appendable else None,
+        "rows": rows,
+    })
+
+@dataclass
+class UrlRefresh:
+    status: str                 # "full", "appended" ou "not_modified"
+    flights: List[Flight]
+
+def refresh_flights_from_url(url: str, store: UrlSourceStore, mapping: Optional[Dict[str, Optional[str]]] = None,
+                             incremental: bool = True, stats: Optional[PriceStats] = None,
+                             chunk_size: int = 5000, on_progress: Optional[ProgressFn] = None,
+                             cancel: Optional[threading.Event] = None) -> UrlRefresh:
+    """
+    Recarrega uma URL já conhecida sem diálogo, usando o mapeamento salvo.
+    Com `incremental`, envia If-None-Match/If-Modified-Since + Range a partir do fim já lido:
+      304 → nada mudou; 206 com os últimos bytes conferindo → converte e devolve só as linhas novas;
+      qualquer outra resposta (200, 416, cauda diferente, gzip) → recarga completa.
+    """
+    state = store.get(url) or {}
+    mapping = mapping or state.get("mapping")
+    if not mapping:
+        raise ValueError("Nenhum mapeamento salvo para esta URL.")
+
+    if incremental and state.get("length") and (state.get("etag") or state.get("last_modified")):
+        length = state["length"]
+        tail = base64.b64decode(state["tail"] or "")
+        hdrs = {"Range": f"bytes={length - len(tail)}-", "Accept-Encoding": "identity"}
+        if state.get("etag"):
+            hdrs["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            hdrs["If-Modified-Since"] = state["last_modified"]
+        resp = shared_session().get(url, timeout=60, stream=True, headers=hdrs)
+        if resp.status_code == 304:
+            resp.close()
+            return UrlRefresh("not_modified", [])
+        if resp.status_code == 206:
+            try:
+                stream = CSVStream(url, cancel, resp=resp, headers=state["headers"], expect_prefix=tail)
+            except _PrefixMismatch:
+                stream = None
+            if stream is not None:
+                try:
+                    flights: List[Flight] = []
+                    for chunk in iter_flight_chunks(stream, mapping, chunk_size, stats, on_progress,
+                                                    start=state.get("rows", 0) + 1):
+                        flights.extend(chunk)
+                    _remember(store, url, stream, mapping, length - len(tail) + stream.bytes_read,
+                              state.get("rows", 0) + stream.rows_read)
+                    return UrlRefresh("appended", flights)
+                finally:
+                    stream.close()
+        else:
+            resp.close()
+
+    stream = CSVStream(url, cancel)
+    try:
+        flights = []
+        for chunk in iter_flight_chunks(stream, mapping, chunk_size, stats, on_progress):
+            flights.extend(chunk)
+        _remember(store, url, stream, mapping, stream.bytes_read, stream.rows_read)
+        return UrlRefresh("full", flights)
+    finally:
+        stream.close()
+
+def load_flights_from_url(url: str, ask_mapping: Callable[[List[str]], Optional[Dict[str, Optional[str]]]],
+                          stats: Optional[PriceStats] = None, chunk_size: int = 5000,
+                          on_progress: Optional[ProgressFn] = None, cancel: Optional[threading.Event] = None,
+                          store: Optional[UrlSourceStore] = None) -> List[Flight]:
+    """
+    Abre a URL, pede o mapeamento com `ask_mapping(cabeçalho)` assim que o cabeçalho chega (None = desistiu)
+    e converte o restante do arquivo em blocos. Pode rodar fora da thread do Tk: só `ask_mapping` precisa
+    tocar em widgets. Levanta LoadCancelled se `cancel` for sinalizado durante a carga.
+    Com `store`, o mapeamento e os validadores HTTP ficam salvos para refresh_flights_from_url.
+    """
+    stream = CSVStream(url, cancel)
+    try:
+        mapping = ask_mapping(stream.headers)
+        if mapping is None:
+            return []
+        flights: List[Flight] = []
+        for chunk in iter_flight_chunks(stream, mapping, chunk_size, stats, on_progress):
+            flights.extend(chunk)
+        if store is not None:
+            _remember(store, url, stream, mapping, stream.bytes_read, stream.rows_read)
+        return flights
+    finally:
+        stream.close()
+
+def load_flights_from_url_via_mapping(master, url: str, stats: Optional[PriceStats] = None,
+                                      chunk_size: int = 5000, on_progress: Optional[ProgressFn] = None,
+                                      cancel: Optional[threading.Event] = None,
+                                      store: Optional[UrlSourceStore] = None) -> List[Flight]:
+    """Versão síncrona (thread do Tk): o mapeamento vem do CSVMappingDialog modal."""
+    from csv_mapping_dialog import CSVMappingDialog      # só aqui precisa de Tk
+    def ask(headers: List[str]):
+        dlg = CSVMappingDialog(master, headers)
+        master.wait_window(dlg)
+        return dlg.mapping
+    return load_flights_from_url(url, ask, stats, chunk_size, on_progress, cancel, store)
@@ -1,5 +1,7 @@
-from typing import List, Iterable
+from typing import List, Iterable, Optional
 from models import Flight
+from sketches import PriceStats
+from tracing import TRACER
 import csv
 import random
 from datetime import datetime, timedelta
@@ -12,7 +14,13 @@ AIRPORTS = [
     "FOR", "NAT", "CWB", "FLN", "BEL", "MCO", "JFK", "LIS", "CDG"
 ]
 
-def parse_csv(path: str) -> List[Flight]:
+def parse_csv(path: str, stats: Optional[PriceStats] = None) -> List[Flight]:
+    with TRACER.span("parse_csv") as sp:
+        flights = _parse_csv(path, stats)
+        sp.rows_out = len(flights)
+    return flights
+
+def _parse_csv(path: str, stats: Optional[PriceStats] = None) -> List[Flight]:
     flights: List[Flight] = []
     with open(path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -20,7 +28,7 @@ def parse_csv(path: str) -> List[Flight]:
         if not required.issubset(set(reader.fieldnames or [])):
             raise ValueError(f"CSV must have headers: {sorted(required)}")
         for row in reader:
-            flights.append(Flight(
+            fl = Flight(
                 flight_id=row["flight_id"],
                 airline=row["airline"],
                 origin=row["origin"],
@@ -29,7 +37,10 @@ def parse_csv(path: str) -> List[Flight]:
                 depart_time=row["depart_time"],
                 arrive_time=row["arrive_time"],
                 price=float(row["price"].replace(",", ".")) if isinstance(row["price"], str) else float(row["price"]),
-            ))
+            )
+            flights.append(fl)
+            if stats is not None:
+                stats.add(fl)
     return flights
 
 def write_csv(path: str, flights: Iterable[Flight]):
@@ -0,0 +1,196 @@
+# fake_tp_server.py
+# Servidor local que imita a Data API do Travelpayouts (v3 prices_for_dates e v2 latest)
+# a partir de generate_synthetic, com latência, taxa de erro, throttling (429) e paginação configuráveis.
+# Uso: python fake_tp_server.py --port 8765 --n 50000 --latency 20 --error-rate 0.02 --rps 50
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import List, Dict, Optional, Tuple
+
+from models import Flight
+import data_loader as dl
+
+class FakeTravelpayouts:
+    """Estado do servidor: dados indexados por rota e parâmetros de falha/latência."""
+    def __init__(self, flights: List[Flight], latency_ms: Tuple[float, float] = (0.0, 0.0),
+                 error_rate: float = 0.0, max_rps: Optional[float] = None, retry_after: float = 1.0,
+                 seed: int = 7):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent: deque = deque()
+        self.served = self.errors = self.throttled = 0
+        self.by_route: Dict[Tuple[str, str], List[Flight]] = {}
+        for f in sorted(flights, key=lambda f: f.price):
+            self.by_route.setdefault((f.origin, f.destination), []).append(f)
+
+    def _select(self, origin: str, destination: str) -> List[Flight]:
+        if origin and destination:
+            return self.by_route.get((origin, destination), [])
+        out = [f for (o, d), fl in self.by_route.items()
+               if (not origin or o == origin) and (not destination or d == destination) for f in fl]
+        out.sort(key=lambda f: f.price)
+        return out
+
+    # ---------- falhas simuladas ----------
+    def gate(self) -> Optional[int]:
+        """Aplica latência e decide se a requisição falha: devolve 429/500 ou None."""
+        lo, hi = self.latency_ms
+        with self._lock:
+            delay = self._rng.uniform(lo, hi) / 1000 if hi else 0.0
+            fail = self._rng.random() < self.error_rate
+            now = time.monotonic()
+            if self.max_rps:
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.max_rps:
+                    self.throttled += 1
+                    return 429
+                self._recent.append(now)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            return 500
+        return None
+
+    # ---------- payloads ----------
+    @staticmethod
+    def _page(items: list, q: Dict[str, str]) -> list:
+        limit = max(1, int(q.get("limit") or 100))
+        page = max(1, int(q.get("page") or 1))
+        return items[(page - 1) * limit: page * limit]
+
+    def prices_for_dates(self, q: Dict[str, str]) -> dict:
+        dep = q.get("departure_at", "")
+        items = [f for f in self._select(q.get("origin", ""), q.get("destination", "")) if f.date.startswith(dep)]
+        data = [{
+            "origin": f.origin,
+            "destination": f.destination,
+            "price": f.price,
+            "airline": f.airline,
+            "flight_number": f.flight_id[-4:],
+            "departure_at": f"{f.date}T{f.depart_time}:00-03:00",
+            "transfers": 0,
+            "duration": f.duration_minutes,
+        } for f in self._page(items, q)]
+        return {"success": True, "data": data, "currency": q.get("currency", "brl").lower()}
+
+    def latest(self, q: Dict[str, str]) -> dict:
+        month = (q.get("beginning_of_period") or "")[:7]
+        items = [f for f in self._select(q.get("origin", ""), q.get("destination", "")) if f.date.startswith(month)]
+        data = [{
+            "origin": f.origin,
+            "destination": f.destination,
+            "value": f.price,
+            "gate": f.airline,
+            "depart_date": f.date,
+            "number_of_changes": 0,
+            "duration": f.duration_minutes,
+            "found_at": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        } for f in self._page(items, q)]
+        return {"success": True, "data": data, "currency": q.get("currency", "brl").lower()}
+
+def _handler(state: FakeTravelpayouts):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"      # keep-alive, para medir reuso de conexões
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            u = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(u.query).items()}
+            if u.path == "/aviasales/v3/prices_for_dates":
+                build = state.prices_for_dates
+            elif u.path == "/v2/prices/latest":
+                build = state.latest
+            else:
+                return self._send(404, {"success": False, "error": "not found"})
+            if not q.get("token"):
+                return self._send(401, {"success": False, "error": "Unauthorized"})
+            code = state.gate()
+            if code == 429:
+                return self._send(429, {"success": False, "error": "rate limit"},
+                                  {"Retry-After": f"{state.retry_after:g}"})
+            if code:
+                return self._send(code, {"success": False, "error": "internal error"})
+            with state._lock:
+                state.served += 1
+            self._send(200, build(q))
+    return Handler
+
+class FakeTravelpayoutsServer:
+    """Sobe o servidor numa thread; `base_url` serve para TravelpayoutsClient(base_url=...)."""
+    def __init__(self, state: FakeTravelpayouts, host: str = "127.0.0.1", port: int = 0):
+        self.state = state
+        self.httpd = ThreadingHTTPServer((host, port), _handler(state))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeTravelpayoutsServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor local imitando a API do Travelpayouts.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--n", type=int, default=20000, help="voos sintéticos")
+    ap.add_argument("--days", type=int, default=60)
+    ap.add_argument("--start-date", default=None)
+    ap.add_argument("--latency", type=float, nargs="+", default=[0.0], help="ms (ou min max)")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rps", type=float, default=None, help="acima disso responde 429")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    args = ap.parse_args()
+    lat = (args.latency[0], args.latency[-1])
+    flights = dl.generate_synthetic(n=args.n, start_date=args.start_date, days=args.days)
+    state = FakeTravelpayouts(flights, lat, args.error_rate, args.rps, args.retry_after)
+    srv = FakeTravelpayoutsServer(state, args.host, args.port)
+    print(f"Fake Travelpayouts em {srv.base_url} ({len(flights)} voos). Ctrl+C para sair.")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
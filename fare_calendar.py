@@ -0,0 +1,156 @@
+# fare_calendar.py
+# Cubo de agregados de tarifa por (origem, destino, data): min/max/média/contagem + voo mais barato.
+# Construído uma vez por dataset e atualizado incrementalmente em add/remove.
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Iterable
+from bisect import insort, bisect_left
+
+from models import Flight
+
+@dataclass
+class FareStats:
+    origin: str
+    destination: str
+    period: str               # "YYYY-MM-DD", "YYYY-MM" ou "*" (rota inteira)
+    count: int
+    min_price: float
+    max_price: float
+    avg_price: float
+    cheapest: Optional[Flight]
+
+class _Cell:
+    """
+    Preços de um dia/rota mantidos ordenados: min/max em O(1), remoção em O(log n + k).
+    Entradas são achadas pela identidade do voo (a célula já fixa rota e dia; falta partida + companhia)
+    com o preço guardado na inserção: remover funciona com um objeto igual (não o mesmo) ou cujo
+    preço mudou depois. O índice por identidade só é montado na primeira remoção da célula.
+    """
+    __slots__ = ("items", "flights", "by_key", "total", "_seq")
+
+    def __init__(self):
+        self.items: List[Tuple[float, int]] = []                # (preço guardado, seq)
+        self.flights: Dict[int, Flight] = {}                    # seq → voo
+        # (partida, companhia) → ((preço, seq), ...): tuplas e não listas, o GC não precisa rastreá-las
+        self.by_key: Optional[Dict[Tuple[str, str], Tuple[Tuple[float, int], ...]]] = None
+        self.total = 0.0
+        self._seq = 0
+
+    def add(self, f: Flight):
+        self._seq += 1
+        p = f.price
+        insort(self.items, (p, self._seq))
+        self.flights[self._seq] = f
+        self.total += p
+        if self.by_key is not None:
+            k = (f.depart_time, f.airline)
+            self.by_key[k] = self.by_key.get(k, ()) + ((p, self._seq),)
+
+    def _index(self) -> Dict[Tuple[str, str], Tuple[Tuple[float, int], ...]]:
+        if self.by_key is None:
+            idx: Dict[Tuple[str, str], Tuple[Tuple[float, int], ...]] = {}
+            for p, seq in self.items:
+                f = self.flights[seq]
+                k = (f.depart_time, f.airline)
+                idx[k] = idx.get(k, ()) + ((p, seq),)
+            self.by_key = idx
+        return self.by_key
+
+    def remove(self, f: Flight) -> bool:
+        by_key = self._index()
+        k = (f.depart_time, f.airline)
+        entries = by_key.get(k)
+        if not entries:
+            return False
+        # duplicatas da mesma identidade: prefere a entrada do próprio objeto
+        j = next((j for j, (_, seq) in enumerate(entries) if self.flights[seq] is f), 0)
+        p, seq = entries[j]
+        rest = entries[:j] + entries[j + 1:]
+        if rest:
+            by_key[k] = rest
+        else:
+            del by_key[k]
+        i = bisect_left(self.items, (p, seq))
+        del self.items[i]
+        del self.flights[seq]
+        self.total -= p
+        return True
+
+    def __len__(self):
+        return len(self.items)
+
+class FareCalendar:
+    def __init__(self, flights: Iterable[Flight] = ()):
+        self._cells: Dict[Tuple[str, str], Dict[str, _Cell]] = {}
+        self.add_many(flights)
+
+    # ---------- manutenção incremental ----------
+    def add(self, f: Flight):
+        days = self._cells.setdefault((f.origin, f.destination), {})
+        cell = days.get(f.date)
+        if cell is None:
+            cell = days[f.date] = _Cell()
+        cell.add(f)
+
+    def add_many(self, flights: Iterable[Flight]):
+        for f in flights:
+            self.add(f)
+
+    def remove(self, f: Flight) -> bool:
+        """Remove um voo previamente adicionado (mesmo objeto). Retorna False se não estava no cubo."""
+        days = self._cells.get((f.origin, f.destination))
+        cell = days.get(f.date) if days else None
+        if cell is None or not cell.remove(f):
+            return False
+        if not cell:
+            del days[f.date]
+            if not days:
+                del self._cells[(f.origin, f.destination)]
+        return True
+
+    # ---------- consultas ----------
+    @staticmethod
+    def _stats(origin: str, destination: str, period: str, cells: List[_Cell]) -> Optional[FareStats]:
+        cells = [c for c in cells if c]
+        if not cells:
+            return None
+        count = sum(len(c) for c in cells)
+        total = sum(c.total for c in cells)
+        lo = min(cells, key=lambda c: c.items[0])
+        hi = max(c.items[-1][0] for c in cells)
+        return FareStats(origin, destination, period, count, lo.items[0][0], hi, total / count,
+                         lo.flights[lo.items[0][1]])
+
+    def day(self, origin: str, destination: str, date: str) -> Optional[FareStats]:
+        cell = self._cells.get((origin, destination), {}).get(date)
+        return self._stats(origin, destination, date, [cell] if cell else [])
+
+    def days(self, origin: str, destination: str, prefix: str = "") -> List[FareStats]:
+        """Estatística por dia da rota (opcionalmente só datas com o prefixo 'YYYY' / 'YYYY-MM'), em ordem de data."""
+        days = self._cells.get((origin, destination), {})
+        return [self._stats(origin, destination, d, [days[d]]) for d in sorted(days) if d.startswith(prefix)]
+
+    def month(self, origin: str, destination: str, month: str) -> Optional[FareStats]:
+        days = self._cells.get((origin, destination), {})
+        return self._stats(origin, destination, month, [c for d, c in days.items() if d.startswith(month)])
+
+    def route(self, origin: str, destination: str) -> Optional[FareStats]:
+        return self._stats(origin, destination, "*", list(self._cells.get((origin, destination), {}).values()))
+
+    def cheapest_days(self, origin: str, destination: str, prefix: str = "", k: int = 5) -> List[FareStats]:
+        """'Dia mais barato para voar GRU→REC neste mês': top-k dias por menor preço."""
+        return sorted(self.days(origin, destination, prefix), key=lambda s: s.min_price)[:k]
+
+    def heatmap(self, origin: str, prefix: str = "") -> Dict[str, Dict[str, float]]:
+        """{destino: {data: menor preço}} para todas as rotas partindo de `origin`."""
+        out: Dict[str, Dict[str, float]] = {}
+        for (o, d), days in self._cells.items():
+            if o != origin:
+                continue
+            out[d] = {day: c.items[0][0] for day, c in sorted(days.items()) if day.startswith(prefix)}
+        return out
+
+    def routes(self) -> List[Tuple[str, str]]:
+        return sorted(self._cells)
+
+    def __len__(self):
+        return sum(len(c) for days in self._cells.values() for c in days.values())
@@ -1,22 +1,46 @@
 # main.py
-import json
-import threading
-from pathlib import Path
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import customtkinter as ctk
-from typing import List, Optional, Callable
-from datetime import date, datetime
-
-from models import Flight
-import data_loader as dl              # parse_csv / write_csv / generate_synthetic / AIRLINES / AIRPORTS
-from algorithms import sort_list, search_by_value
-from providers import TravelpayoutsClient
+from startup import TIMER, lazy_module
+
+with TIMER.imports_block():
+    import json
+    import threading
+    from pathlib import Path
+    import tkinter as tk
+    from tkinter import ttk, filedialog, messagebox
+    import customtkinter as ctk
+    from typing import List, Optional, TYPE_CHECKING
+    from datetime import date, datetime
+
+    from models import Flight
+    import data_loader as dl              # parse_csv / write_csv / generate_synthetic / AIRLINES / AIRPORTS
+    from virtual_table import VirtualTable
+    from query_engine import Query, run_query, search_price
+    from query_executor import QueryExecutor, CancelToken, QueryCancelled
+    from tracing import TRACER, format_tree
+    from price_alerts import AlertBook, AlertMatch
+    from flight_merge import MergeIndex, MergeResult
+    from sketches import PriceStats
+
+# Carregados só no primeiro uso: rede (requests), CSV por URL, conexões e calendário de tarifas
+providers = lazy_module("providers")
+response_cache = lazy_module("response_cache")
+url_loader = lazy_module("csv_url_loader")
+mapping_dialog = lazy_module("csv_mapping_dialog")
+routes = lazy_module("routes")
+fares = lazy_module("fare_calendar")
+if TYPE_CHECKING:
+    from routes import RouteGraph
+    from fare_calendar import FareCalendar
+    from response_cache import ResponseCache
+    from csv_url_loader import UrlSourceStore
 
 APP_TITLE = "Flight Finder — CustomTkinter + Treeview + Travelpayouts (dark + busca flexível)"
 
 # ---------------- Config (config.json ao lado do script) ----------------
 CONFIG_PATH = Path(__file__).resolve().with_name("config.json")
+CACHE_DIR = Path(__file__).resolve().with_name(".tp_cache")   # respostas do Travelpayouts já convertidas
+URL_SOURCES_PATH = Path(__file__).resolve().with_name("url_sources.json")   # mapeamento + ETag por URL
+ALERTS_PATH = Path(__file__).resolve().with_name("alerts.json")              # alertas de preço permanentes
 
 def load_config() -> dict:
     try:
@@ -27,6 +51,16 @@ def load_config() -> dict:
 def save_config(cfg: dict) -> None:
     CONFIG_PATH.write_text(json.dumps(cfg, ensure_ascii=False, indent=2), encoding="utf-8")
 
+_network_ready = False
+
+def ensure_network(cfg: dict) -> None:
+    """Na primeira chamada importa a stack de rede e aplica o bloco "http" do config.json."""
+    global _network_ready
+    if not _network_ready:
+        if isinstance(cfg.get("http"), dict):      # ex.: {"pool_maxsize": 64, "max_retries": 6}
+            providers.configure_session(**cfg["http"])
+        _network_ready = True
+
 # ---------------- Dialog de configuração do token ----------------
 class TPConfigDialog(ctk.CTkToplevel):
     def __init__(self, master, initial_token: str | None):
@@ -70,7 +104,8 @@ class TPConfigDialog(ctk.CTkToplevel):
         self.update_idletasks()
         try:
             month_start = date.today().replace(day=1).isoformat()
-            cli = TravelpayoutsClient(token=token)
+            ensure_network(load_config())
+            cli = providers.TravelpayoutsClient(token=token)
             _ = cli.latest("GRU", "SDU", period_type="month", beginning_of_period=month_start, limit=1)
             self.status.configure(text="✅ Conexão OK!")
         except Exception as e:
@@ -88,22 +123,190 @@ class TPConfigDialog(ctk.CTkToplevel):
         self.result = None
         self.destroy()
 
+# ---------------- Painel de rastreamento (spans das últimas consultas) ----------------
+class TracePanel(ctk.CTkToplevel):
+    def __init__(self, master, last: int = 20):
+        super().__init__(master)
+        self.title("Rastreamento — últimas operações")
+        self.geometry("900x520")
+        self.last = last
+
+        bar = ctk.CTkFrame(self); bar.pack(fill="x", padx=10, pady=(10,6))
+        self.enabled_var = tk.BooleanVar(value=TRACER.enabled)
+        self.memory_var = tk.BooleanVar(value=TRACER.memory)
+        ctk.CTkCheckBox(bar, text="Ativo", variable=self.enabled_var, command=self._toggle).pack(side="left", padx=4)
+        ctk.CTkCheckBox(bar, text="Memória (tracemalloc, mais lento)", variable=self.memory_var,
+                        command=self._toggle).pack(side="left", padx=4)
+        ctk.CTkButton(bar, text="Atualizar", width=90, command=self.refresh).pack(side="left", padx=4)
+        ctk.CTkButton(bar, text="Limpar", width=80, command=self._clear).pack(side="left", padx=4)
+        ctk.CTkButton(bar, text="Exportar Chrome trace…", command=lambda: self._export("chrome")).pack(side="right", padx=4)
+        ctk.CTkButton(bar, text="Exportar JSON…", command=lambda: self._export("json")).pack(side="right", padx=4)
+
+        self.text = ctk.CTkTextbox(self, font=("Courier New", 12), wrap="none")
+        self.text.pack(fill="both", expand=True, padx=10, pady=(0,10))
+        self.refresh()
+        self._tick()
+
+    def _tick(self):
+        if self.winfo_exists():
+            self.after(1000, self._tick)
+            self.refresh()
+
+    def refresh(self):
+        roots = TRACER.recent(self.last)
+        body = "\n\n".join(format_tree(sp) for sp in reversed(roots)) or "Nenhum span registrado ainda."
+        if self.text.get("1.0", "end-1c") != body:
+            self.text.delete("1.0", "end")
+            self.text.insert("1.0", body)
+
+    def _toggle(self):
+        TRACER.enabled = self.enabled_var.get()
+        TRACER.set_memory(self.memory_var.get())
+
+    def _clear(self):
+        TRACER.clear()
+        self.refresh()
+
+    def _export(self, fmt: str):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")],
+                                            initialfile="trace_chrome.json" if fmt == "chrome" else "trace.json")
+        if not path:
+            return
+        try:
+            TRACER.export(path, fmt)
+            messagebox.showinfo("OK", f"Rastreamento salvo em:\n{path}", parent=self)
+        except Exception as e:
+            messagebox.showerror("Erro ao exportar", str(e), parent=self)
+
+# ---------------- Alertas de preço ----------------
+class AlertsDialog(ctk.CTkToplevel):
+    def __init__(self, master, book: AlertBook):
+        super().__init__(master)
+        self.title("Alertas de preço")
+        self.geometry("820x420")
+        self.book = book
+
+        form = ctk.CTkFrame(self); form.pack(fill="x", padx=10, pady=(10,6))
+        self.o, self.d, self.when, self.price, self.airline = (tk.StringVar() for _ in range(5))
+        for text, var, w in (("Origem", self.o, 70), ("Destino", self.d, 70),
+                             ("Período (YYYY-MM, A..B)", self.when, 190), ("Preço ≤", self.price, 90),
+                             ("Companhia", self.airline, 110)):
+            ctk.CTkLabel(form, text=text).pack(side="left", padx=(6,2))
+            ctk.CTkEntry(form, textvariable=var, width=w).pack(side="left")
+        ctk.CTkButton(form, text="Adicionar", width=90, command=self._add).pack(side="left", padx=8)
+
+        bar = ctk.CTkFrame(self); bar.pack(fill="x", padx=10, pady=(0,6))
+        self.rm_id = tk.StringVar()
+        ctk.CTkLabel(bar, text="Nº do alerta").pack(side="left", padx=(6,2))
+        ctk.CTkEntry(bar, textvariable=self.rm_id, width=60).pack(side="left")
+        ctk.CTkButton(bar, text="Remover", width=80, command=self._remove).pack(side="left", padx=6)
+        ctk.CTkButton(bar, text="Notificar de novo", command=self._reset).pack(side="left", padx=6)
+        ctk.CTkLabel(bar, text="Origem/destino vazios = qualquer. Casados a cada lote carregado.").pack(side="right", padx=6)
+
+        self.text = ctk.CTkTextbox(self, font=("Courier New", 12), wrap="none")
+        self.text.pack(fill="both", expand=True, padx=10, pady=(0,10))
+        self.refresh()
+
+    def refresh(self):
+        lines = []
+        for a in self.book.alerts():
+            seen = "—" if a.best_price is None else f"{a.best_price:.2f}"
+            lines.append(f"{a.describe():<60} último notificado: {seen}")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(lines) or "Nenhum alerta cadastrado.")
+
+    def _add(self):
+        try:
+            price = float(self.price.get().replace(",", "."))
+            a = self.book.add(self.o.get().strip(), self.d.get().strip(), price, self.when.get(),
+                              self.airline.get().strip() or None)
+        except ValueError as e:
+            messagebox.showerror("Alerta inválido", str(e) or "Informe um preço numérico.", parent=self)
+            return
+        self.refresh()
+        self.master.check_alerts(a)
+
+    def _remove(self):
+        try:
+            ok = self.book.remove(int(self.rm_id.get()))
+        except ValueError:
+            ok = False
+        if not ok:
+            messagebox.showwarning("Alertas", "Número de alerta não encontrado.", parent=self)
+        self.refresh()
+
+    def _reset(self):
+        self.book.reset()
+        self.refresh()
+
 # ---------------- App ----------------
 class App(ctk.CTk):
     def __init__(self):
-        super().__init__()
-        ctk.set_appearance_mode("system")
-        ctk.set_default_color_theme("blue")
-        self.title(APP_TITLE)
-        self.geometry("1200x740")
-        self.minsize(1040, 640)
+        with TIMER.phase("janela Tk"):
+            super().__init__()
+            ctk.set_appearance_mode("system")
+            ctk.set_default_color_theme("blue")
+            self.title(APP_TITLE)
+            self.geometry("1200x740")
+            self.minsize(1040, 640)
 
         self.cfg = load_config()
+        self._tp_cache: Optional["ResponseCache"] = None       # stack de rede: criada na 1ª busca online
+        self._url_store: Optional["UrlSourceStore"] = None
+        self._url_source: Optional[str] = None          # URL de onde veio o dataset atual
+        self._url_cancel: Optional[threading.Event] = None   # carga por URL em andamento
         self.all_flights: List[Flight] = []
         self.filtered: List[Flight] = []
         self.sorted_by_key: Optional[str] = None
+        self._graph: Optional["RouteGraph"] = None   # índice de conexões (lazy, por dataset)
+        self._calendar: Optional["FareCalendar"] = None  # agregados de tarifa (lazy, por dataset)
+        self.price_stats: PriceStats = PriceStats()     # distribuição de preços (alimentada na ingestão)
+        self._merged: Optional[MergeIndex] = None        # identidade → posição do dataset (modo "Mesclar fontes")
+        self._stats_stale = 0                            # preços substituídos que o sketch ainda conta
+        self._open_trace = None                          # span da consulta em andamento (rastreamento)
+        self._trace_panel: Optional[TracePanel] = None
 
-        self._build_ui()
+        self.executor = QueryExecutor(self)
+        self.alerts = AlertBook.load(ALERTS_PATH)
+        # lotes podem chegar de threads de download: a notificação sempre roda na thread do Tk
+        self.alerts.listeners.append(lambda matches: self.executor.post(lambda: self._notify_alerts(matches)))
+        self._alerts_dialog: Optional[AlertsDialog] = None
+        with TIMER.phase("UI principal"):
+            self._build_ui()
+        if self.alerts.load_error:
+            self.status_lbl.configure(text=f"Alertas: {self.alerts.load_error}")
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # painéis secundários depois que a janela aparece
+        self.after_idle(self._build_deferred)
+
+    def _on_close(self):
+        if self._url_cancel is not None:
+            self._url_cancel.set()          # a thread de download para no próximo bloco
+        self.executor.shutdown()
+        self.destroy()
+
+    def _build_deferred(self):
+        with TIMER.phase("UI secundária"):
+            self._build_online_panel()
+        self.update_idletasks()
+        TIMER.mark_ready()
+        if TIMER.enabled:
+            print("\n" + TIMER.report() + "\n")
+
+    @property
+    def tp_cache(self) -> "ResponseCache":
+        if self._tp_cache is None:
+            ensure_network(self.cfg)
+            self._tp_cache = response_cache.ResponseCache(CACHE_DIR, **self.cfg.get("cache", {}))
+        return self._tp_cache
+
+    @property
+    def url_store(self) -> "UrlSourceStore":
+        if self._url_store is None:
+            ensure_network(self.cfg)
+            self._url_store = url_loader.UrlSourceStore(URL_SOURCES_PATH)
+        return self._url_store
 
     # ---------- TEMA DARK para ttk.Treeview ----------
     def _style_dark_treeview(self):
@@ -156,11 +359,21 @@ class App(ctk.CTk):
 
         # Topbar
         top = ctk.CTkFrame(self); top.pack(fill="x", padx=10, pady=(10,6))
-        ctk.CTkButton(top, text="Carregar CSV…", command=self.load_csv).pack(side="left", padx=4)
-        ctk.CTkButton(top, text="Gerar Dataset Demo", command=self.generate_demo).pack(side="left", padx=4)
+        self._load_buttons = [
+            ctk.CTkButton(top, text="Carregar CSV…", command=self.load_csv),
+            ctk.CTkButton(top, text="CSV por URL…", command=self.load_csv_url),
+            ctk.CTkButton(top, text="Gerar Dataset Demo", command=self.generate_demo),
+        ]
+        for b in self._load_buttons:
+            b.pack(side="left", padx=4)
         ctk.CTkButton(top, text="Salvar resultados CSV…", command=self.save_results).pack(side="left", padx=4)
         ctk.CTkButton(top, text="Limpar filtros", command=self.clear_filters).pack(side="left", padx=4)
+        self.merge_sources = tk.BooleanVar(value=bool(self.cfg.get("merge_sources", False)))
+        ctk.CTkCheckBox(top, text="Mesclar fontes", variable=self.merge_sources,
+                        command=self._toggle_merge).pack(side="left", padx=(10,4))
         ctk.CTkButton(top, text="Configurar Travelpayouts…", command=self.config_tp).pack(side="right", padx=4)
+        ctk.CTkButton(top, text="Rastreamento", command=self.open_trace_panel).pack(side="right", padx=4)
+        ctk.CTkButton(top, text="Alertas…", command=self.open_alerts).pack(side="right", padx=4)
 
         # Filtros / Opções
         box = ctk.CTkFrame(self); box.pack(fill="x", padx=10, pady=6)
@@ -178,6 +391,10 @@ class App(ctk.CTk):
         self.search_algo = tk.StringVar(value="linear")
         self.search_mode = tk.StringVar(value="<=")
         self.search_value = tk.StringVar()
+        self.live_filter = tk.BooleanVar(value=False)
+        for var in (self.origin, self.destination, self.date, self.max_price, self.airline,
+                    self.sort_key, self.sort_algo, self.sort_desc):
+            var.trace_add("write", self._on_filter_change)
 
         # Linha 1
         r1 = ctk.CTkFrame(box); r1.pack(fill="x", padx=8, pady=6)
@@ -194,6 +411,8 @@ class App(ctk.CTk):
         ctk.CTkLabel(r1, text="Companhia").pack(side="left")
         self.cb_airline = ctk.CTkComboBox(r1, variable=self.airline, width=150, values=sorted(dl.AIRLINES))
         self.cb_airline.pack(side="left", padx=(4,10))
+        ctk.CTkCheckBox(r1, text="Filtro ao digitar", variable=self.live_filter,
+                        command=self._on_filter_change).pack(side="left", padx=(6,0))
 
         # Linha 2
         r2 = ctk.CTkFrame(box); r2.pack(fill="x", padx=8, pady=(0,8))
@@ -210,22 +429,12 @@ class App(ctk.CTk):
 
         ctk.CTkButton(r2, text="Aplicar Filtros + Ordenar", command=self.apply_filters_and_sort).pack(side="left", padx=12)
         ctk.CTkButton(r2, text="Executar Busca por Preço", command=self.run_search_price).pack(side="left", padx=4)
-
-        # ONLINE (Travelpayouts) — campos OPCIONAIS
-        online = ctk.CTkFrame(self); online.pack(fill="x", padx=10, pady=(0,8))
-        self.online_date = tk.StringVar()
-        ctk.CTkLabel(
-            online, 
-            text="ONLINE · Origem (opcional) / Destino (opcional) / Data (opcional: YYYY-MM ou YYYY-MM-DD)"
-        ).pack(side="left", padx=(0,8))
-        self.ent_o = ctk.CTkEntry(online, width=80); self.ent_o.insert(0, ""); self.ent_o.pack(side="left", padx=4)
-        self.ent_d = ctk.CTkEntry(online, width=80); self.ent_d.insert(0, ""); self.ent_d.pack(side="left", padx=4)
-        self.ent_date = ctk.CTkEntry(online, textvariable=self.online_date, width=140); 
-        self.ent_date.insert(0, ""); self.ent_date.pack(side="left", padx=4)
-        ctk.CTkButton(online, text="Buscar Online (Travelpayouts)", command=self.fetch_online).pack(side="left", padx=12)
+        ctk.CTkButton(r2, text="Buscar Conexões", command=self.run_connections).pack(side="left", padx=4)
+        ctk.CTkButton(r2, text="Dias mais baratos", command=self.run_cheapest_days).pack(side="left", padx=4)
 
         # Tabela (rápida) — ttk.Treeview dark dentro do CTk
-        table_f = ctk.CTkFrame(self); table_f.pack(fill="both", expand=True, padx=10, pady=(0,8))
+        table_f = self._table_frame = ctk.CTkFrame(self)
+        table_f.pack(fill="both", expand=True, padx=10, pady=(0,8))
         cols = ("flight_id","airline","origin","destination","date","depart","arrive","dur","price")
         self.tree = ttk.Treeview(table_f, columns=cols, show="headings", height=20, style="Dark.Treeview")
         headings = ["ID","Companhia","Origem","Destino","Data","Partida","Chegada","Duração (min)","Preço"]
@@ -236,10 +445,10 @@ class App(ctk.CTk):
         self.tree.column("dur", width=120)
         self.tree.pack(side="left", fill="both", expand=True)
 
-        # Scrollbar dark (CustomTkinter)
-        vs = ctk.CTkScrollbar(table_f, command=self.tree.yview)
+        # Scrollbar dark (CustomTkinter) — controlada pela tabela virtual (só a janela visível vira item)
+        vs = ctk.CTkScrollbar(table_f)
         vs.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=vs.set)
+        self.table = VirtualTable(self.tree, vs, self._row_values, row_height=28)
 
         # Linhas zebradas
         self.tree.tag_configure("odd",  background="#1E1E1E")
@@ -252,7 +461,45 @@ class App(ctk.CTk):
         self.status_lbl = ctk.CTkLabel(self, text="Dica: gere dataset demo ou use a busca online (configure o token primeiro).")
         self.status_lbl.pack(fill="x", padx=10, pady=(0,10))
 
+    def _build_online_panel(self):
+        # ONLINE (Travelpayouts) — campos OPCIONAIS
+        online = ctk.CTkFrame(self); online.pack(fill="x", padx=10, pady=(0,8), before=self._table_frame)
+        self.online_date = tk.StringVar()
+        ctk.CTkLabel(
+            online, 
+            text="ONLINE · Origem (opcional) / Destino (opcional) / Data (opcional: YYYY-MM ou YYYY-MM-DD)"
+        ).pack(side="left", padx=(0,8))
+        self.ent_o = ctk.CTkEntry(online, width=80); self.ent_o.insert(0, ""); self.ent_o.pack(side="left", padx=4)
+        self.ent_d = ctk.CTkEntry(online, width=80); self.ent_d.insert(0, ""); self.ent_d.pack(side="left", padx=4)
+        self.ent_date = ctk.CTkEntry(online, textvariable=self.online_date, width=140); 
+        self.ent_date.insert(0, ""); self.ent_date.pack(side="left", padx=4)
+        ctk.CTkButton(online, text="Buscar Online (Travelpayouts)", command=self.fetch_online).pack(side="left", padx=12)
+
     # ---------------- Ações Topbar ----------------
+    def open_alerts(self):
+        if self._alerts_dialog is not None and self._alerts_dialog.winfo_exists():
+            self._alerts_dialog.lift()
+            return
+        self._alerts_dialog = AlertsDialog(self, self.alerts)
+
+    def check_alerts(self, alert):
+        """Alerta recém-criado: confere uma vez contra o dataset já carregado."""
+        self.alerts.backfill(alert, self.all_flights)
+
+    def _notify_alerts(self, matches: List[AlertMatch]):
+        for m in matches:
+            print("ALERTA:", m.describe())
+        self.bell()
+        self.status_lbl.configure(text=f"🔔 {len(matches)} alerta(s): " + " | ".join(m.describe() for m in matches[:3]))
+        if self._alerts_dialog is not None and self._alerts_dialog.winfo_exists():
+            self._alerts_dialog.refresh()
+
+    def open_trace_panel(self):
+        if self._trace_panel is not None and self._trace_panel.winfo_exists():
+            self._trace_panel.lift()
+            return
+        self._trace_panel = TracePanel(self)
+
     def config_tp(self):
         dlg = TPConfigDialog(self, initial_token=self.cfg.get("travelpayouts_token"))
         self.wait_window(dlg)
@@ -266,12 +513,106 @@ class App(ctk.CTk):
         path = filedialog.askopenfilename(title="Escolha o CSV", filetypes=[("CSV","*.csv")])
         if not path:
             return
-        try:
-            flights = dl.parse_csv(path)
-        except Exception as e:
-            messagebox.showerror("Erro ao ler CSV", str(e))
+        stats = PriceStats()
+        with TRACER.span("ingest.csv", path=Path(path).name) as sp:
+            try:
+                flights = dl.parse_csv(path, stats=stats)
+            except Exception as e:
+                messagebox.showerror("Erro ao ler CSV", str(e))
+                return
+            sp.rows_out = len(flights)
+            self.set_dataset(flights, f"Carregado {len(flights)} voos de '{path}'", stats=stats)
+
+    def _set_loading(self, busy: bool):
+        for b in self._load_buttons:
+            b.configure(state="disabled" if busy else "normal")
+
+    def load_csv_url(self):
+        if self._url_cancel is not None:
+            return                              # já há uma carga por URL em andamento
+        url = ctk.CTkInputDialog(text="URL do CSV (http/https, pode ser .gz):", title="Carregar CSV por URL").get_input()
+        if not url or not url.strip():
             return
-        self.set_dataset(flights, f"Carregado {len(flights)} voos de '{path}'")
+        url = url.strip()
+        store = self.url_store                 # cria a stack de rede aqui, na thread do Tk
+        known = store.get(url)
+        incremental = (url == self._url_source)
+        stats = PriceStats()
+        cancel = self._url_cancel = threading.Event()
+        bind_id = self.bind("<Escape>", lambda e: cancel.set())
+        self._set_loading(True)
+        trace = TRACER.start("ingest.url", url=url)
+        dialog: dict = {}
+
+        # download e conversão rodam numa thread; só o diálogo de mapeamento e a tela ficam no Tk
+        def progress(rows: int, got: int, total: Optional[int]):
+            pct = f" ({got * 100 // total}%)" if total else ""
+            text = f"Baixando… {rows:,} linhas, {got / 1e6:.1f} MB{pct} — Esc cancela"
+            self.executor.post(lambda: self.status_lbl.configure(text=text))
+
+        def ask_mapping(headers: List[str]):
+            ready = threading.Event()
+
+            def show():
+                dlg = dialog["dlg"] = mapping_dialog.CSVMappingDialog(self, headers)
+
+                def check():
+                    if dlg.winfo_exists():
+                        self.after(100, check)
+                    else:
+                        dialog["mapping"] = dlg.mapping
+                        ready.set()
+                check()
+            self.executor.post(show)
+            while not ready.wait(0.1):
+                if cancel.is_set():
+                    raise url_loader.LoadCancelled("Carga cancelada.")
+            return dialog.get("mapping")
+
+        def finish(status: str, flights: List[Flight], error: Optional[Exception] = None):
+            try:
+                self.unbind("<Escape>", bind_id)
+                self._url_cancel = None
+                self._set_loading(False)
+                dlg = dialog.get("dlg")
+                if dlg is not None and dlg.winfo_exists():
+                    dlg.destroy()
+                with TRACER.span("ui", parent=trace):
+                    if isinstance(error, url_loader.LoadCancelled):
+                        self.status_lbl.configure(text="Carga por URL cancelada.")
+                    elif error is not None:
+                        messagebox.showerror("Erro ao carregar URL", str(error))
+                    elif status == "not_modified":
+                        self.status_lbl.configure(text=f"'{url}' não mudou desde a última carga (304).")
+                    elif status == "appended":
+                        self.append_flights(flights, f"+{len(flights)} voos novos de '{url}' (download incremental)",
+                                            stats=stats)
+                    elif flights:
+                        self.set_dataset(flights, f"Carregado {len(flights)} voos de '{url}'", stats=stats)
+                        self._url_source = url
+            finally:
+                trace.set(status=status)
+                trace.rows_out = len(flights)
+                TRACER.end(trace)
+
+        def work():
+            try:
+                with TRACER.span("download", parent=trace):
+                    if known and known.get("mapping"):
+                        # URL conhecida: sem diálogo; se for a mesma do dataset atual, só baixa o que mudou
+                        res = url_loader.refresh_flights_from_url(url, store, incremental=incremental, stats=stats,
+                                                                  on_progress=progress, cancel=cancel)
+                        status, flights = res.status, res.flights
+                    else:
+                        flights = url_loader.load_flights_from_url(url, ask_mapping, stats, on_progress=progress,
+                                                                   cancel=cancel, store=store)
+                        status = "full"
+            except Exception as e:
+                self.executor.post(lambda e=e: finish("error", [], e))
+                return
+            self.executor.post(lambda: finish(status, flights))
+
+        threading.Thread(target=work, daemon=True, name="url-load").start()
 
     def generate_demo(self):
         flights = dl.generate_synthetic(n=1200, days=20)
@@ -295,92 +636,180 @@ class App(ctk.CTk):
         self.max_price.set(""); self.airline.set(""); self.search_value.set("")
         self.sort_key.set("price"); self.sort_algo.set("timsort"); self.sort_desc.set(False)
         self.search_algo.set("linear"); self.search_mode.set("<=")
+        self.executor.cancel("query")
         self.filtered = self.all_flights
         self.refresh_table(self.filtered)
         self.metrics_lbl.configure(text="Filtros limpos.")
 
     # ---------------- Dataset / Tabela ----------------
-    def set_dataset(self, flights: List[Flight], msg: str):
-        self.all_flights = flights
-        self.filtered = flights
-        self.sorted_by_key = None
+    def _toggle_merge(self):
+        self.cfg["merge_sources"] = self.merge_sources.get()
+        save_config(self.cfg)
+        if not self.merge_sources.get():
+            self._merged = None
+
+    def _new_merge_index(self, flights=()) -> MergeIndex:
+        # config.json: "merge_policy": "cheapest" | "latest", "merge_bloom": true
+        return MergeIndex(flights, policy=self.cfg.get("merge_policy", "cheapest"),
+                          bloom=bool(self.cfg.get("merge_bloom", False)))
+
+    def _refresh_choices(self, flights: List[Flight]):
         uniq_airports = sorted({f.origin for f in flights} | {f.destination for f in flights}) or dl.AIRPORTS
         uniq_airlines = sorted({f.airline for f in flights}) or dl.AIRLINES
         self.cb_origin.configure(values=uniq_airports)
         self.cb_dest.configure(values=uniq_airports)
         self.cb_airline.configure(values=uniq_airlines)
+
+    def set_dataset(self, flights: List[Flight], msg: str, stats: Optional[PriceStats] = None,
+                    alerts_matched: bool = False):
+        if self.merge_sources.get() and self.all_flights:
+            self.merge_flights(flights, msg, alerts_matched=alerts_matched)
+            return
+        with TRACER.span("set_dataset", rows_in=len(flights)):
+            if stats is None:
+                stats = PriceStats()
+                stats.add_many(flights)
+            self.executor.cancel("query")      # resultado pendente seria do dataset anterior
+            self.price_stats = stats
+            self.all_flights = flights
+            self.filtered = flights
+            self.sorted_by_key = None
+            self._graph = None
+            self._calendar = None
+            self._url_source = None
+            self._merged = None
+            self._stats_stale = 0
+            self._refresh_choices(flights)
+            self.refresh_table(self.filtered)
+            if stats.n:
+                p50, p90, p99 = stats.quantiles((0.5, 0.9, 0.99))
+                msg += f" | Preços p50={p50:.2f} p90={p90:.2f} p99={p99:.2f}"
+            self.status_lbl.configure(text=msg)
+            if not alerts_matched:
+                with TRACER.span("alerts.match", rows_in=len(flights)):
+                    self.alerts.match(flights)
+
+    def append_flights(self, flights: List[Flight], msg: str, stats: Optional[PriceStats] = None):
+        """Anexa voos ao dataset atual atualizando os índices incrementalmente (sem reconstruir tudo)."""
+        if self.merge_sources.get():
+            self.merge_flights(flights, msg)
+            return
+        if stats is None:
+            stats = PriceStats()
+            stats.add_many(flights)
+        self.executor.cancel("query")
+        self.all_flights = self.all_flights + flights
+        self.filtered = self.all_flights
+        self.sorted_by_key = None
+        self.price_stats.merge(stats)
+        if self._calendar is not None:
+            self._calendar.add_many(flights)
+        self._graph = None          # grafo de conexões é reconstruído sob demanda
         self.refresh_table(self.filtered)
-        self.status_lbl.configure(text=msg)
+        self.status_lbl.configure(text=f"{msg} | total {len(self.all_flights)}")
+        self.alerts.match(flights)          # só o lote novo
+
+    def merge_flights(self, flights: List[Flight], msg: str, alerts_matched: bool = False):
+        """
+        Mescla um lote ao dataset atual pela identidade do voo (rota, data, partida, companhia): O(1) por
+        linha, sem reordenar. Só os voos que entraram (novos ou mais baratos) alimentam índices e alertas.
+        """
+        with TRACER.span("merge", rows_in=len(flights)) as sp:
+            self.executor.cancel("query")
+            if self._merged is None:
+                self._merged = self._new_merge_index(self.all_flights)     # uma vez; depois só os lotes
+                collapsed = len(self.all_flights) - len(self._merged)
+                if collapsed:
+                    # duplicatas que já estavam no dataset: o calendário é refeito sob demanda
+                    self._calendar = None
+                    self._stats_stale += collapsed
+            res = self._merged.add_many(flights)
+            sp.rows_out = len(res.changed)
+            sp.set(added=len(res.added), replaced=len(res.replaced), kept=res.kept)
+            # cópia: consultas em andamento no worker ainda podem estar lendo a lista anterior
+            self.all_flights = list(self._merged.flights)
+            self.filtered = self.all_flights
+            self.sorted_by_key = None
+            self._graph = None
+            if self._calendar is not None:
+                for old in res.displaced:
+                    self._calendar.remove(old)
+                self._calendar.add_many(res.changed)
+            # o sketch de quantis não remove itens: os preços substituídos ficam contados até passarem
+            # de 10% do dataset, quando ele é refeito (O(n) amortizado entre muitos lotes)
+            self._stats_stale += len(res.displaced)
+            if self._stats_stale > len(self.all_flights) // 10:
+                self.price_stats = PriceStats()
+                self.price_stats.add_many(self.all_flights)
+                self._stats_stale = 0
+            else:
+                self.price_stats.add_many(res.changed)
+            self._refresh_choices(self.all_flights)
+            self.refresh_table(self.filtered)
+            self.status_lbl.configure(text=f"{msg} | mesclado: {res.describe()} | total {len(self.all_flights)}")
+            if not alerts_matched:
+                self.alerts.match(res.changed)
+
+    @staticmethod
+    def _row_values(f: Flight) -> tuple:
+        return (f.flight_id, f.airline, f.origin, f.destination, f.date,
+                f.depart_time, f.arrive_time, f.duration_minutes, f"{f.price:.2f}")
 
     def refresh_table(self, flights: List[Flight]):
-        self.tree.delete(*self.tree.get_children())
-        to_show = flights[:5000]
-        for i in range(0, len(to_show), 500):
-            chunk = to_show[i:i+500]
-            for idx, f in enumerate(chunk, start=i):
-                tag = "odd" if (idx % 2) else "even"
-                self.tree.insert(
-                    "", "end",
-                    values=(f.flight_id, f.airline, f.origin, f.destination, f.date,
-                            f.depart_time, f.arrive_time, f.duration_minutes, f"{f.price:.2f}"),
-                    tags=(tag,),
-                )
-            self.update_idletasks()
+        # sem limite de linhas: a tabela virtual formata só o que aparece na tela
+        with TRACER.span("refresh_table", rows_in=len(flights)):
+            self.table.set_data(flights)
 
     # ---------------- Filtros, Ordenação e Busca ----------------
-    def _apply_filters(self, data: List[Flight]) -> List[Flight]:
-        def ok(f: Flight) -> bool:
-            if self.origin.get() and f.origin != self.origin.get(): return False
-            if self.destination.get() and f.destination != self.destination.get(): return False
-            if self.airline.get() and f.airline != self.airline.get(): return False
-            if self.date.get().strip():
-                d = self.date.get().strip()
-                if len(d) == 10:
-                    if f.date != d: return False
-                elif len(d) == 7:
-                    if not f.date.startswith(d): return False
-                elif len(d) == 4:
-                    if not f.date.startswith(d): return False
-                else:
-                    return False
-            if self.max_price.get().strip():
-                try: m = float(self.max_price.get().replace(",", "."))
-                except ValueError: return False
-                if f.price > m: return False
-            return True
-        return [f for f in data if ok(f)]
-
-    def _sort_key(self) -> Callable[[Flight], object]:
-        k = self.sort_key.get()
-        if k == "price": return lambda f: f.price
-        if k == "depart_time": return lambda f: (f.date, f.depart_time)
-        if k == "duration": return lambda f: f.duration_minutes
-        return lambda f: f.price
-
-    def apply_filters_and_sort(self):
+    # As consultas rodam no QueryExecutor (fora da thread do Tk): os parâmetros são lidos dos
+    # widgets aqui, e os resultados voltam via after() para atualizar a tabela.
+    def _query(self) -> Query:
+        return Query(origin=self.origin.get(), destination=self.destination.get(), airline=self.airline.get(),
+                     date=self.date.get().strip(), max_price=self.max_price.get().strip(),
+                     sort_key=self.sort_key.get(), sort_algo=self.sort_algo.get(), descending=self.sort_desc.get())
+
+    def apply_filters_and_sort(self, quiet: bool = False):
         if not self.all_flights:
-            messagebox.showwarning("Sem dados", "Carregue um CSV ou gere um dataset.")
+            if not quiet:
+                messagebox.showwarning("Sem dados", "Carregue um CSV ou gere um dataset.")
             return
-        data = self._apply_filters(self.all_flights)
-        try:
-            sorted_data, sm = sort_list(self.sort_algo.get(), data, self._sort_key(), reverse=self.sort_desc.get())
-        except Exception as e:
+        data_all = self.all_flights
+        q = self._query()
+
+        def work(token: CancelToken):
+            return run_query(data_all, q, token)
+
+        def done(res):
+            sm = res.sort_metrics
+            print("\n--- MÉTRICAS DE ORDENAÇÃO ---")
+            print(sm)
+            print("---------------------------\n")
+
+            self.filtered = res.flights
+            self.sorted_by_key = q.sort_key
+            self.refresh_table(self.filtered)
+            comps = "-" if sm.comparisons is None else f"{sm.comparisons:,}"
+            moves = "-" if sm.swaps_or_moves is None else f"{sm.swaps_or_moves:,}"
+            under = ""
+            try:
+                m = float(q.max_price.replace(",", "."))
+                under = f" | {self.price_stats.fraction_under(m) * 100:.1f}% do dataset ≤ {m:.2f}"
+            except ValueError:
+                pass
+            self.metrics_lbl.configure(text=(
+                f"Ordenados {sm.n} por '{q.sort_key}' ({sm.algorithm}) em {sm.time_ms:.2f} ms | "
+                f"comparações={comps}, movs={moves}. Resultados: {len(self.filtered)}{under}"
+            ))
+
+        def failed(e: BaseException):
             messagebox.showerror("Erro de ordenação", str(e))
-            return
-        
-        print("\n--- MÉTRICAS DE ORDENAÇÃO ---")
-        print(sm) 
-        print("---------------------------\n")
 
-        self.filtered = sorted_data
-        self.sorted_by_key = self.sort_key.get()
-        self.refresh_table(self.filtered)
-        comps = "-" if sm.comparisons is None else f"{sm.comparisons:,}"
-        moves = "-" if sm.swaps_or_moves is None else f"{sm.swaps_or_moves:,}"
-        self.metrics_lbl.configure(text=(
-            f"Ordenados {sm.n} por '{self.sort_key.get()}' ({sm.algorithm}) em {sm.time_ms:.2f} ms | "
-            f"comparações={comps}, movs={moves}. Resultados: {len(self.filtered)}"
-        ))
+        self.metrics_lbl.configure(text="Filtrando/ordenando…")
+        self._submit_query("consulta", len(data_all), work, done, failed, sort=q.sort_key)
+
+    def _on_filter_change(self, *_):
+        if self.live_filter.get():
+            self.executor.debounce("live-filter", 300, lambda: self.apply_filters_and_sort(quiet=True))
 
     def run_search_price(self):
         if not self.filtered:
@@ -391,29 +820,124 @@ class App(ctk.CTk):
         except Exception:
             messagebox.showerror("Entrada inválida", "Informe um preço numérico.")
             return
-        data = list(self.filtered)
-        assume_sorted = False
-        if self.search_algo.get() == "binary":
-            if self.sorted_by_key == "price" and not self.sort_desc.get():
-                assume_sorted = True
-            else:
-                data, _ = sort_list("timsort", data, key=lambda f: f.price, reverse=False)
-                assume_sorted = True
-        res, met = search_by_value(self.search_algo.get(), data, key=lambda f: f.price,
-                                   target=target, mode=self.search_mode.get(), assume_sorted=assume_sorted)
-        
-        print("\n--- MÉTRICAS DE BUSCA ---")
-        print(met)
-        print("-----------------------\n")
-
-        if not res:
-            self.metrics_lbl.configure(text=f"Busca ({met.algorithm}, {met.details}) {met.time_ms:.2f} ms — 0 itens.")
-            messagebox.showinfo("Sem resultados", "Nada encontrado para o critério.")
+        filtered = self.filtered
+        algo, mode = self.search_algo.get(), self.search_mode.get()
+        presorted = self.sorted_by_key == "price" and not self.sort_desc.get()
+
+        def work(token: CancelToken):
+            return search_price(filtered, algo, mode, target, presorted, token)
+
+        def done(result):
+            res, met = result
+            print("\n--- MÉTRICAS DE BUSCA ---")
+            print(met)
+            print("-----------------------\n")
+
+            if not res:
+                self.metrics_lbl.configure(text=f"Busca ({met.algorithm}, {met.details}) {met.time_ms:.2f} ms — 0 itens.")
+                messagebox.showinfo("Sem resultados", "Nada encontrado para o critério.")
+                return
+            self.refresh_table(res)
+            self.metrics_lbl.configure(text=(
+                f"Busca ({met.algorithm}, {met.details}) {met.time_ms:.2f} ms | "
+                f"comparações={met.comparisons} | encontrados={len(res)}"
+            ))
+
+        def failed(e: BaseException):
+            messagebox.showerror("Erro na busca", str(e))
+
+        self._submit_query("busca por preço", len(filtered), work, done, failed, algo=algo, mode=mode)
+
+    def _submit_query(self, name: str, rows_in: int, work, done, failed, **attrs):
+        """
+        Submete ao executor sob um span raiz que cobre o worker e a atualização da tela (thread do Tk).
+        Uma consulta substituída por outra mais nova tem o span fechado como cancelada.
+        """
+        if self._open_trace is not None:
+            self._open_trace.set(cancelled=True)
+            TRACER.end(self._open_trace)
+        trace = self._open_trace = TRACER.start(name, rows_in=rows_in, **attrs)
+
+        def traced_work(token: CancelToken):
+            try:
+                with TRACER.span("worker", parent=trace):
+                    return work(token)
+            except QueryCancelled:
+                trace.set(cancelled=True)
+                TRACER.end(trace)
+                raise
+
+        def traced_done(res):
+            try:
+                with TRACER.span("ui", parent=trace):
+                    done(res)
+            finally:
+                TRACER.end(trace)
+                if self._open_trace is trace:
+                    self._open_trace = None
+
+        def traced_failed(e: BaseException):
+            TRACER.end(trace)
+            failed(e)
+
+        self.executor.submit("query", traced_work, traced_done, traced_failed)
+
+    # ---------------- Conexões (multi-trecho) ----------------
+    def route_graph(self) -> "RouteGraph":
+        if self._graph is None:
+            self._graph = routes.RouteGraph(self.all_flights)
+        return self._graph
+
+    def run_connections(self):
+        if not self.all_flights:
+            messagebox.showwarning("Sem dados", "Carregue um CSV ou gere um dataset.")
+            return
+        origin, dest = self.origin.get().strip(), self.destination.get().strip()
+        d = self.date.get().strip()
+        if not origin or not dest or len(d) != 10:
+            messagebox.showerror("Entrada inválida", "Informe origem, destino e data (YYYY-MM-DD).")
+            return
+        g = self.route_graph()
+        its, met = g.cheapest(origin, dest, d, max_connections=2, limit=20)
+        if not its:
+            self.metrics_lbl.configure(text=f"Conexões ({met.algorithm}) {met.time_ms:.2f} ms — 0 itinerários.")
+            messagebox.showinfo("Sem resultados", "Nenhum itinerário encontrado.")
+            return
+        legs = [f for it in its for f in it.legs]
+        self.filtered = legs
+        self.sorted_by_key = None
+        self.refresh_table(legs)
+        self.metrics_lbl.configure(text=(
+            f"Conexões ({met.algorithm}) {met.time_ms:.2f} ms | itinerários={len(its)} | "
+            f"melhor: {its[0].describe()}"
+        ))
+
+    # ---------------- Calendário de tarifas ----------------
+    def fare_calendar(self) -> "FareCalendar":
+        if self._calendar is None:
+            self._calendar = fares.FareCalendar(self.all_flights)
+        return self._calendar
+
+    def run_cheapest_days(self):
+        if not self.all_flights:
+            messagebox.showwarning("Sem dados", "Carregue um CSV ou gere um dataset.")
+            return
+        origin, dest = self.origin.get().strip(), self.destination.get().strip()
+        if not origin or not dest:
+            messagebox.showerror("Entrada inválida", "Informe origem e destino.")
+            return
+        prefix = self.date.get().strip()[:7]
+        days = self.fare_calendar().cheapest_days(origin, dest, prefix, k=31)
+        if not days:
+            messagebox.showinfo("Sem resultados", "Nenhuma tarifa para a rota/período.")
             return
-        self.refresh_table(res)
+        self.filtered = [s.cheapest for s in days]
+        self.sorted_by_key = "price"
+        self.refresh_table(self.filtered)
+        month = self.fare_calendar().month(origin, dest, prefix) if prefix else self.fare_calendar().route(origin, dest)
         self.metrics_lbl.configure(text=(
-            f"Busca ({met.algorithm}, {met.details}) {met.time_ms:.2f} ms | "
-            f"comparações={met.comparisons} | encontrados={len(res)}"
+            f"{origin}→{dest} {prefix or '*'}: dia mais barato {days[0].period} ({days[0].min_price:.2f}) | "
+            f"mín={month.min_price:.2f} méd={month.avg_price:.2f} máx={month.max_price:.2f} n={month.count}"
         ))
 
     # ---------------- Helpers ONLINE ----------------
@@ -449,18 +973,42 @@ class App(ctk.CTk):
         # Se o usuário forneceu os 3 (origem+destino+data YYYY-MM-DD) => tentamos a busca exata
         use_exact = bool(origin and dest and date_str and len(date_str) == 10)
         month_start = self._month_start_from_input(date_str)
+        max_results = int(self.cfg.get("online_max_results", 2000))
+        cache = self.tp_cache          # cria a stack de rede aqui, na thread do Tk
+
+        stream = self._new_merge_index()     # dedup na chegada: páginas e endpoints repetem ofertas
+        trace = TRACER.start("ingest.online", origin=origin, destination=dest, month=month_start[:7])
+
+        def publish(flights: List[Flight], msg: str, stats: PriceStats):
+            try:
+                with TRACER.span("ui", parent=trace):
+                    self.set_dataset(flights, msg, stats=stats, alerts_matched=True)
+            finally:
+                TRACER.end(trace)
 
         def work():
             try:
-                cli = TravelpayoutsClient(token=token)
-                flights: List[Flight] = []
+                # cada página recebida já é casada com os alertas, antes de terminar o download
+                cli = providers.TravelpayoutsClient(token=token, cache=cache, on_batch=self.alerts.match)
+                dup = MergeResult()
 
-                if use_exact:
-                    flights = cli.prices_for_dates(origin, dest, date_str, direct=False, limit=120)
-                    if not flights:
-                        flights = cli.latest(origin, dest, period_type="month", beginning_of_period=month_start, limit=200)
-                else:
-                    flights = cli.latest(origin, dest, period_type="month", beginning_of_period=month_start, limit=200)
+                with TRACER.span("download", parent=trace) as sp:
+                    if use_exact:
+                        for f in cli.prices_for_dates(origin, dest, date_str, direct=False, limit=120):
+                            stream.add(f, dup)
+                    if not len(stream):
+                        # v2/latest paginado: consome as páginas conforme chegam (a próxima já vem em prefetch)
+                        for n, f in enumerate(cli.iter_latest(origin, dest, period_type="month",
+                                                              beginning_of_period=month_start, page_size=200,
+                                                              max_results=max_results, prefetch=2), 1):
+                            stream.add(f, dup)
+                            if n % 200 == 0:
+                                self.executor.post(lambda n=n: self.status_lbl.configure(text=f"Online: {n} ofertas recebidas…"))
+                    flights = stream.flights
+                    sp.rows_out = len(flights)
+                    sp.set(duplicates=dup.kept + len(dup.replaced))
+                stats = PriceStats()
+                stats.add_many(flights)       # depois do dedup: quantis sem as ofertas repetidas
 
                 if not flights:
                     raise RuntimeError("Nenhum resultado retornado. Tente informar ao menos origem OU destino, ou outra data.")
@@ -469,9 +1017,17 @@ class App(ctk.CTk):
                 parts.append(origin or "*")
                 parts.append(dest or "*")
                 tag = " · ".join(parts) + f" · {month_start[:7]}"
-                self.set_dataset(flights, f"Online: {len(flights)} ofertas [{tag}] (Travelpayouts).")
+                cm = cache.metrics()
+                msg = (f"Online: {len(flights)} ofertas [{tag}] (Travelpayouts) | "
+                       f"cache hits={cm['hits'] + cm['stale_hits']} misses={cm['misses']}.")
+                if dup.kept or dup.replaced:
+                    msg += f" {dup.kept + len(dup.replaced)} ofertas repetidas descartadas."
+                trace.rows_out = len(flights)
+                self.executor.post(lambda: publish(flights, msg, stats))
             except Exception as e:
-                self.status_lbl.configure(text=f"Falha no online: {e}")
+                trace.set(error=str(e)[:80])
+                TRACER.end(trace)
+                self.executor.post(lambda e=e: self.status_lbl.configure(text=f"Falha no online: {e}"))
 
         threading.Thread(target=work, daemon=True).start()
 
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import timedelta
+import temporal
 
 @dataclass
 class Flight:
@@ -14,18 +15,18 @@ class Flight:
 
     @property
     def depart_datetime(self):
-        return datetime.fromisoformat(f"{self.date} {self.depart_time}:00")
+        return temporal.to_datetime(self.date, self.depart_time)
 
     @property
     def arrive_datetime(self):
-        d = datetime.fromisoformat(f"{self.date} {self.arrive_time}:00")
+        d = temporal.to_datetime(self.date, self.arrive_time)
         if d < self.depart_datetime:
             d += timedelta(days=1)
         return d
 
     @property
     def duration_minutes(self) -> int:
-        return int((self.arrive_datetime - self.depart_datetime).total_seconds() // 60)
+        return temporal.duration_minutes(self.depart_time, self.arrive_time)
 
     def as_row(self):
         return [
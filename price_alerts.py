@@ -0,0 +1,292 @@
+# price_alerts.py
+# Alertas de preço permanentes ("avise quando GRU→LIS ficar abaixo de 2500 em março").
+# Os alertas ficam indexados por (origem, destino) e por dia; cada lote novo de voos é casado
+# só contra os alertas daquela rota/data — custo proporcional ao lote, não a alertas × dataset.
+import os
+import json
+import time
+import threading
+import itertools
+from bisect import insort
+from dataclasses import dataclass, asdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from models import Flight
+
+ANY = "*"
+MAX_WINDOW_DAYS = 400         # janelas maiores viram "qualquer data" (checadas por data no match)
+
+@dataclass
+class PriceAlert:
+    origin: str                              # IATA ou "*"
+    destination: str                         # IATA ou "*"
+    max_price: float
+    date_from: Optional[str] = None          # YYYY-MM-DD (inclusive); None = sem limite
+    date_to: Optional[str] = None
+    airline: Optional[str] = None
+    label: str = ""
+    id: int = 0
+    best_price: Optional[float] = None       # menor preço já notificado (só notifica se baixar)
+
+    def describe(self) -> str:
+        when = ""
+        if self.date_from or self.date_to:
+            when = f" {self.date_from or '…'}..{self.date_to or '…'}"
+        airline = f" [{self.airline}]" if self.airline else ""
+        return f"#{self.id} {self.origin}→{self.destination}{when} ≤ {self.max_price:.2f}{airline}"
+
+    def on_route(self, f: Flight) -> bool:
+        return self.origin in (ANY, f.origin) and self.destination in (ANY, f.destination)
+
+    def accepts(self, f: Flight) -> bool:
+        if f.price > self.max_price:
+            return False
+        if self.airline and f.airline != self.airline:
+            return False
+        if self.date_from and f.date < self.date_from:
+            return False
+        if self.date_to and f.date > self.date_to:
+            return False
+        return True
+
+@dataclass
+class AlertMatch:
+    alert: PriceAlert
+    flight: Flight
+    previous_best: Optional[float]
+
+    def describe(self) -> str:
+        f = self.flight
+        return (f"{self.alert.label or self.alert.describe()}: {f.origin}→{f.destination} {f.date} {f.depart_time} "
+                f"{f.airline} {f.price:.2f}")
+
+def parse_window(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """'' → sem limite; 'YYYY' / 'YYYY-MM' / 'YYYY-MM-DD' → período; 'A..B' → de A a B (cada lado pode faltar)."""
+    text = (text or "").strip()
+    if not text:
+        return None, None
+    if ".." in text:
+        a, b = (p.strip() for p in text.split("..", 1))
+        return (_bounds(a)[0] if a else None), (_bounds(b)[1] if b else None)
+    return _bounds(text)
+
+def _bounds(p: str) -> Tuple[str, str]:
+    if len(p) == 10:
+        date.fromisoformat(p)
+        return p, p
+    if len(p) == 7:
+        y, m = int(p[:4]), int(p[5:7])
+        first = date(y, m, 1)
+        last = (date(y + (m == 12), m % 12 + 1, 1) - timedelta(days=1))
+        return first.isoformat(), last.isoformat()
+    if len(p) == 4:
+        int(p)
+        return f"{p}-01-01", f"{p}-12-31"
+    raise ValueError(f"Data inválida: {p!r} (use YYYY, YYYY-MM ou YYYY-MM-DD)")
+
+def _days(a: str, b: str) -> List[str]:
+    d, end = date.fromisoformat(a), date.fromisoformat(b)
+    out = []
+    while d <= end:
+        out.append(d.isoformat())
+        d += timedelta(days=1)
+    return out
+
+class _Bucket:
+    """Alertas de uma rota+dia em ordem decrescente de preço-limite: para no primeiro que não cabe."""
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items: List[Tuple[float, int, PriceAlert]] = []     # (-max_price, id, alerta)
+
+    def add(self, a: PriceAlert):
+        insort(self.items, (-a.max_price, a.id, a))
+
+    def remove(self, a: PriceAlert):
+        self.items = [it for it in self.items if it[1] != a.id]
+
+    def candidates(self, price: float) -> Iterable[PriceAlert]:
+        for neg, _, a in self.items:
+            if price > -neg:
+                break
+            yield a
+
+class AlertBook:
+    """
+    Índice: (origem, destino) → { dia | ANY → _Bucket }. Origem/destino podem ser ANY; cada voo consulta
+    no máximo 4 rotas × 2 chaves de dia. `match` é thread-safe (lotes chegam de threads de download).
+    """
+    def __init__(self, alerts: Iterable[PriceAlert] = (), path: Optional[str | Path] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()      # lotes de threads diferentes podem salvar ao mesmo tempo
+        self.load_error: Optional[str] = None
+        self._alerts: Dict[int, PriceAlert] = {}
+        self._index: Dict[Tuple[str, str], Dict[str, _Bucket]] = {}
+        self._ids = itertools.count(1)
+        self.checked = 0                 # voos avaliados (métrica)
+        self.listeners: List[Callable[[List[AlertMatch]], None]] = []
+        for a in alerts:
+            self._insert(a)
+
+    # ---------- cadastro ----------
+    def _keys(self, a: PriceAlert) -> List[str]:
+        if a.date_from and a.date_to and a.date_from <= a.date_to:
+            days = _days(a.date_from, a.date_to)
+            if len(days) <= MAX_WINDOW_DAYS:
+                return days
+        return [ANY]
+
+    def _insert(self, a: PriceAlert):
+        if not a.id:
+            a.id = next(self._ids)
+        else:
+            self._ids = itertools.count(max(a.id, max(self._alerts, default=0)) + 1)
+        self._alerts[a.id] = a
+        days = self._index.setdefault((a.origin or ANY, a.destination or ANY), {})
+        for k in self._keys(a):
+            b = days.get(k)
+            if b is None:
+                b = days[k] = _Bucket()
+            b.add(a)
+
+    def add(self, origin: str, destination: str, max_price: float, window: str = "",
+            airline: Optional[str] = None, label: str = "") -> PriceAlert:
+        date_from, date_to = parse_window(window)
+        a = PriceAlert((origin or ANY).upper(), (destination or ANY).upper(), float(max_price),
+                       date_from, date_to, airline or None, label)
+        with self._lock:
+            self._insert(a)
+        self.save()
+        return a
+
+    def remove(self, alert_id: int) -> bool:
+        with self._lock:
+            a = self._alerts.pop(alert_id, None)
+            if a is None:
+                return False
+            days = self._index.get((a.origin, a.destination), {})
+            for k in self._keys(a):
+                b = days.get(k)
+                if b is not None:
+                    b.remove(a)
+                    if not b.items:
+                        del days[k]
+            if not days:
+                self._index.pop((a.origin, a.destination), None)
+        self.save()
+        return True
+
+    def alerts(self) -> List[PriceAlert]:
+        with self._lock:
+            return sorted(self._alerts.values(), key=lambda a: a.id)
+
+    def __len__(self):
+        return len(self._alerts)
+
+    # ---------- casamento incremental ----------
+    def match(self, flights: Iterable[Flight]) -> List[AlertMatch]:
+        """
+        Casa um lote novo contra os alertas afetados. Cada alerta dispara no máximo uma vez por lote
+        (com o voo mais barato) e só se o preço for menor que o último já notificado.
+        """
+        if not self._index:
+            return []
+        best: Dict[int, Flight] = {}
+        n = 0
+        with self._lock:
+            index = self._index
+            for f in flights:
+                n += 1
+                for route in ((f.origin, f.destination), (f.origin, ANY), (ANY, f.destination), (ANY, ANY)):
+                    days = index.get(route)
+                    if days is None:
+                        continue
+                    for key in (f.date, ANY):
+                        b = days.get(key)
+                        if b is None:
+                            continue
+                        for a in b.candidates(f.price):
+                            if a.accepts(f):
+                                cur = best.get(a.id)
+                                if cur is None or f.price < cur.price:
+                                    best[a.id] = f
+            self.checked += n
+            out = self._fire(best)
+        return self._publish(out)
+
+    def backfill(self, alert: PriceAlert, flights: Iterable[Flight]) -> List[AlertMatch]:
+        """Alerta recém-criado contra dados já carregados (varredura única; lotes seguintes usam o índice)."""
+        cheapest = min((f for f in flights if alert.on_route(f) and alert.accepts(f)),
+                       key=lambda f: f.price, default=None)
+        if cheapest is None:
+            return []
+        with self._lock:
+            out = self._fire({alert.id: cheapest})
+        return self._publish(out)
+
+    def _fire(self, best: Dict[int, Flight]) -> List[AlertMatch]:
+        out: List[AlertMatch] = []
+        for aid, f in best.items():
+            a = self._alerts.get(aid)
+            if a is None or (a.best_price is not None and f.price >= a.best_price):
+                continue
+            out.append(AlertMatch(a, f, a.best_price))
+            a.best_price = f.price
+        out.sort(key=lambda m: m.alert.id)
+        return out
+
+    def _publish(self, out: List[AlertMatch]) -> List[AlertMatch]:
+        if out:
+            self.save()
+            for cb in list(self.listeners):
+                cb(out)
+        return out
+
+    def reset(self, alert_id: Optional[int] = None):
+        """Esquece o melhor preço notificado (todos ou um alerta): voltam a disparar."""
+        with self._lock:
+            for a in self._alerts.values():
+                if alert_id is None or a.id == alert_id:
+                    a.best_price = None
+        self.save()
+
+    # ---------- persistência (JSON) ----------
+    def save(self):
+        """Grava num .tmp e troca com os.replace: quem ler o arquivo vê a versão antiga ou a nova, inteira."""
+        if self.path is None:
+            return
+        with self._save_lock:
+            with self._lock:
+                data = [asdict(a) for a in sorted(self._alerts.values(), key=lambda a: a.id)]
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "AlertBook":
+        """
+        Arquivo ausente = sem alertas. Arquivo ilegível é renomeado para <nome>.corrupt-<timestamp>
+        (não é sobrescrito no próximo save) e o motivo fica em `load_error`.
+        """
+        path = Path(path)
+        error = None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            alerts = [PriceAlert(**d) for d in data]
+        except FileNotFoundError:
+            alerts = []
+        except (OSError, ValueError, TypeError) as e:
+            alerts = []
+            backup = path.with_name(f"{path.name}.corrupt-{time.strftime('%Y%m%d-%H%M%S')}")
+            try:
+                os.replace(path, backup)
+                error = f"{path.name} ilegível ({e}); cópia em {backup.name}"
+            except OSError:
+                error = f"{path.name} ilegível ({e}); alertas não serão salvos nesta sessão"
+                path = None                      # não sobrescreve o arquivo original
+        book = cls(alerts, path)
+        book.load_error = error
+        return book
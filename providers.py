@@ -1,22 +1,19 @@
 # providers.py
-import os, requests
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+import os, time, random, threading, requests
+from collections import deque
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple, Callable
 from models import Flight
+import temporal
+from sketches import PriceStats
+from response_cache import ResponseCache, cache_key
+from tracing import TRACER
 
-def _parse_iso(iso_str: str):
-    """Aceita '2025-09-01T10:30:00Z' ou com offset '+00:00'."""
-    if not iso_str:
-        return None, None
-    s = iso_str.replace("Z", "+00:00")
-    try:
-        dt = datetime.fromisoformat(s)
-        return dt.date().isoformat(), dt.strftime("%H:%M")
-    except Exception:
-        # se vier só 'YYYY-MM-DD'
-        if len(iso_str) == 10:
-            return iso_str, "00:00"
-        return None, None
+# Conversões memoizadas em temporal (mesmas strings de data se repetem muito nas respostas)
+_parse_iso = temporal.parse_iso
 
 def _mk_flight(origin: str, destination: str, airline: str, departure_at: str,
                duration_min: int | None, price: float) -> Flight:
@@ -26,13 +23,11 @@ def _mk_flight(origin: str, destination: str, airline: str, departure_at: str,
         d_date, d_time = "1970-01-01", "00:00"
     # chegada: se houver duração calculamos; senão, reaproveitamos partida
     if duration_min is not None:
-        dt = datetime.fromisoformat(f"{d_date} {d_time}:00")
-        at = dt + timedelta(minutes=int(duration_min))
-        a_time = at.strftime("%H:%M")
+        a_time = temporal.add_minutes(d_time, int(duration_min))
     else:
         a_time = d_time
     return Flight(
-        flight_id=f"API-{origin}-{destination}-{d_date}-{d_time}",
+        flight_id=f"API-{airline or 'NA'}-{origin}-{destination}-{d_date}-{d_time}",   # companhia evita colisão
         airline=airline or "N/A",
         origin=origin,
         destination=destination,
@@ -42,6 +37,243 @@ def _mk_flight(origin: str, destination: str, airline: str, departure_at: str,
         price=float(price or 0.0),
     )
 
+# ---------------- Sessão HTTP compartilhada (pool + keep-alive + retry) ----------------
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Retry-After pode vir em segundos ou como data HTTP."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+class HttpSession:
+    """
+    requests.Session com pool de conexões (keep-alive), gzip e retry com backoff exponencial
+    + jitter (respeita Retry-After em 429/503). Thread-safe para GETs concorrentes.
+    """
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 32, max_retries: int = 4,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0, timeout: float = 30,
+                 retry_statuses: Tuple[int, ...] = RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.retry_statuses = set(retry_statuses)
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=2048)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int, resp: Optional[requests.Response]) -> float:
+        if resp is not None:
+            ra = _retry_after_seconds(resp.headers.get("Retry-After"))
+            if ra is not None:
+                return min(ra, self.backoff_max)
+        # "full jitter": uniforme em [0, base * 2^tentativa]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+            **kw) -> requests.Response:
+        """GET com retry. Devolve a última resposta (o chamador faz raise_for_status) ou relança o erro de rede."""
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            resp = None
+            try:
+                resp = self.session.get(url, params=params, timeout=timeout or self.timeout, **kw)
+                err = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                err = e
+            dt = (time.perf_counter() - t0) * 1000
+            with self._lock:
+                self.requests += 1
+                self._latencies.append(dt)
+            retryable = err is not None or resp.status_code in self.retry_statuses
+            if not retryable or attempt >= self.max_retries:
+                if err is not None or resp.status_code >= 400:
+                    with self._lock:
+                        self.failures += 1
+                if err is not None:
+                    raise err
+                return resp
+            if resp is not None:
+                resp.close()
+            with self._lock:
+                self.retries += 1
+            time.sleep(self._backoff(attempt, resp))
+            attempt += 1
+
+    def _new_connections(self) -> int:
+        # urllib3 conta as conexões abertas por pool em `num_connections`
+        pools = getattr(self.adapter.poolmanager.pools, "_container", {})
+        return sum(getattr(p, "num_connections", 0) for p in list(pools.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latencies)
+            reqs, retries, failures = self.requests, self.retries, self.failures
+        new_conns = self._new_connections()
+        pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0
+        return {
+            "requests": reqs,
+            "retries": retries,
+            "failures": failures,
+            "new_connections": new_conns,
+            "reused_connections": max(0, reqs - new_conns),
+            "p50_ms": pct(0.5),
+            "p99_ms": pct(0.99),
+        }
+
+    def close(self):
+        self.session.close()
+
+_shared: Optional[HttpSession] = None
+_shared_lock = threading.Lock()
+
+def shared_session() -> HttpSession:
+    """Sessão única do processo, criada sob demanda (use configure_session para ajustar)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpSession()
+        return _shared
+
+def configure_session(**kw) -> HttpSession:
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+        _shared = HttpSession(**kw)
+        return _shared
+
+# ---------------- Coalescência de chamadas idênticas em voo ----------------
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Chamadas concorrentes com a mesma chave compartilham uma única execução:
+    a primeira executa `fn`, as demais esperam e recebem o mesmo resultado (ou a mesma exceção).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Any, _Call] = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Any, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "executed": self.executed, "coalesced": self.coalesced,
+                    "in_flight": len(self._inflight)}
+
+_shared_flight = SingleFlight()
+
+def shared_single_flight() -> SingleFlight:
+    """Instância do processo: clientes diferentes (GUI, lotes) coalescem entre si."""
+    return _shared_flight
+
+class RateLimiter:
+    """Token bucket thread-safe: no máximo `rate` chamadas/s, com rajadas de até `burst`."""
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+@dataclass
+class BatchRequest:
+    endpoint: str                    # "latest" ou "prices_for_dates"
+    origin: Optional[str]
+    destination: Optional[str]
+    date: str                        # latest: "YYYY-MM-01"; prices_for_dates: "YYYY-MM[-DD]"
+    limit: int = 100
+
+@dataclass
+class BatchResult:
+    request: BatchRequest
+    flights: List[Flight] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+def market_requests(airports: Iterable[str], months: Iterable[str], endpoint: str = "latest",
+                    limit: int = 100) -> List[BatchRequest]:
+    """Todos os pares origem≠destino × meses ('YYYY-MM' ou 'YYYY-MM-01')."""
+    airports = list(airports)
+    out = []
+    for m in months:
+        d = m if len(m) == 10 or endpoint != "latest" else f"{m}-01"
+        for o in airports:
+            for t in airports:
+                if o != t:
+                    out.append(BatchRequest(endpoint, o, t, d, limit))
+    return out
+
 class TravelpayoutsClient:
     """
     Aviasales / Travelpayouts Data API
@@ -51,15 +283,51 @@ class TravelpayoutsClient:
     """
     BASE = "https://api.travelpayouts.com"
 
-    def __init__(self, token: str | None = None, market: str = "br", currency: str = "BRL"):
+    def __init__(self, token: str | None = None, market: str = "br", currency: str = "BRL",
+                 stats: Optional[PriceStats] = None, base_url: str | None = None, timeout: float = 30,
+                 session: Optional[HttpSession] = None, cache: Optional[ResponseCache] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 on_batch: Optional[Callable[[List[Flight]], Any]] = None):
         self.token = token or os.getenv("TRAVELPAYOUTS_TOKEN", "")
         self.market = market
         self.currency = currency
+        self.base = (base_url or self.BASE).rstrip("/")   # permite apontar para um servidor local
+        self.timeout = timeout
+        self.http = session or shared_session()
+        self.cache = cache          # se informado, respostas já convertidas ficam em disco
+        self.flight = single_flight or shared_single_flight()
+        self.stats = stats          # se informado, recebe os preços de cada resposta
+        self._stats_lock = threading.Lock()
+        self.on_batch = on_batch    # se informado, chamado com cada página recebida (ex.: AlertBook.match)
         if not self.token:
             raise RuntimeError(
                 "Defina a variável de ambiente TRAVELPAYOUTS_TOKEN (grátis no painel Travelpayouts)."
             )
 
+    def _record(self, flights: List[Flight]):
+        if self.stats is not None:
+            with self._stats_lock:
+                self.stats.add_many(flights)
+        if self.on_batch is not None and flights:
+            self.on_batch(flights)
+
+    def _get_flights(self, endpoint: str, url: str, params: Dict[str, Any],
+                     parse: Callable[[Dict[str, Any]], List[Flight]]) -> List[Flight]:
+        with TRACER.span("tp.request", endpoint=endpoint) as sp:
+            def fetch() -> List[Flight]:
+                sp.set(http=True)
+                r = self.http.get(url, params=params, timeout=self.timeout)
+                r.raise_for_status()
+                return parse(r.json())
+            def load() -> List[Flight]:
+                return fetch() if self.cache is None else self.cache.get_or_fetch(endpoint, params, fetch, self.base)
+            # mesma consulta já em andamento (outra thread/cliente)? espera e reaproveita o resultado
+            key = (self.token, cache_key(endpoint, params, self.base))
+            flights = list(self.flight.do(key, load))
+            self._record(flights)
+            sp.rows_out = len(flights)
+            return flights
+
     def prices_for_dates(
         self,
         origin: str,
@@ -71,7 +339,7 @@ class TravelpayoutsClient:
     ) -> List[Flight]:
         # v3: devolve preços por datas específicas com airline + departure_at
         # Doc de referência e exemplos públicos. :contentReference[oaicite:2]{index=2}
-        url = f"{self.BASE}/aviasales/v3/prices_for_dates"
+        url = f"{self.base}/aviasales/v3/prices_for_dates"
         params = {
             "origin": origin,
             "destination": destination,
@@ -83,18 +351,18 @@ class TravelpayoutsClient:
             "market": self.market,
             "token": self.token,
         }
-        r = requests.get(url, params=params, timeout=30)
-        r.raise_for_status()
-        js = r.json()
-        items = js.get("data") or js.get("tickets") or []
-        flights: List[Flight] = []
-        for it in items:
-            price = it.get("price") or it.get("value")
-            airline = it.get("airline") or it.get("main_airline")
-            dep = it.get("departure_at") or it.get("depart_date")
-            duration = it.get("duration")
-            flights.append(_mk_flight(origin, destination, airline, dep, duration, price))
-        return flights
+
+        def parse(js: Dict[str, Any]) -> List[Flight]:
+            items = js.get("data") or js.get("tickets") or []
+            flights: List[Flight] = []
+            for it in items:
+                price = it.get("price") or it.get("value")
+                airline = it.get("airline") or it.get("main_airline")
+                dep = it.get("departure_at") or it.get("depart_date")
+                duration = it.get("duration")
+                flights.append(_mk_flight(origin, destination, airline, dep, duration, price))
+            return flights
+        return self._get_flights("prices_for_dates", url, params, parse)
 
     def latest(
         self,
@@ -105,10 +373,11 @@ class TravelpayoutsClient:
         one_way: bool = False,
         sorting: str = "price",
         limit: int = 100,
+        page: int = 1,
     ) -> List[Flight]:
         # v2/latest — preços encontrados recentemente (retorna depart_date e duration)
         # Doc pública com exemplo de resposta. :contentReference[oaicite:3]{index=3}
-        url = f"{self.BASE}/v2/prices/latest"
+        url = f"{self.base}/v2/prices/latest"
         params = {
             "origin": origin or "",
             "destination": destination or "",
@@ -119,24 +388,119 @@ class TravelpayoutsClient:
             "currency": self.currency,
             "market": self.market,
             "limit": limit,
-            "page": 1,
+            "page": page,
             "token": self.token,
         }
-        r = requests.get(url, params=params, timeout=30)
-        r.raise_for_status()
-        js = r.json()
+
+        def parse(js: Dict[str, Any]) -> List[Flight]:
+            flights: List[Flight] = []
+            for it in js.get("data", []):
+                price = it.get("value")
+                dep_date = it.get("depart_date")  # YYYY-MM-DD
+                # duration total em minutos, se houver
+                duration = it.get("duration")
+                flights.append(_mk_flight(
+                    it.get("origin", origin or "???"),
+                    it.get("destination", destination or "???"),
+                    airline=it.get("gate") or "N/A",
+                    departure_at=dep_date,   # sem hora → "00:00"
+                    duration_min=duration,
+                    price=price,
+                ))
+            return flights
+        return self._get_flights("latest", url, params, parse)
+
+    def iter_latest(
+        self,
+        origin: str | None,
+        destination: str | None,
+        period_type: str = "month",
+        beginning_of_period: str | None = None,
+        one_way: bool = False,
+        sorting: str = "price",
+        page_size: int = 100,
+        max_results: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        prefetch: int = 1,
+    ) -> Iterator[Flight]:
+        """
+        Percorre todas as páginas de v2/latest, entregando voo a voo. Enquanto a página N é
+        consumida, até `prefetch` páginas seguintes já estão sendo baixadas/convertidas em background.
+        Para quando uma página vem incompleta, ou ao atingir `max_results` / `max_pages`.
+        """
+        parent = TRACER.current()      # páginas baixadas em background entram no span de quem itera
+
+        def fetch(page: int) -> List[Flight]:
+            with TRACER.span("tp.page", parent=parent, page=page):
+                return self.latest(origin, destination, period_type, beginning_of_period,
+                                   one_way, sorting, limit=page_size, page=page)
+
+        ex = ThreadPoolExecutor(max_workers=max(1, prefetch))
+        pending: deque = deque()
+        next_page = 1
+        yielded = 0
+        try:
+            while len(pending) < max(1, prefetch) and (max_pages is None or next_page <= max_pages):
+                pending.append(ex.submit(fetch, next_page)); next_page += 1
+            while pending:
+                flights = pending.popleft().result()
+                last = len(flights) < page_size
+                if not last and (max_pages is None or next_page <= max_pages):
+                    pending.append(ex.submit(fetch, next_page)); next_page += 1
+                for f in flights:
+                    yield f
+                    yielded += 1
+                    if max_results is not None and yielded >= max_results:
+                        return
+                if last:
+                    return
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------- Lote (muitas rotas/datas em paralelo) ----------------
+    def _run_one(self, req: BatchRequest) -> List[Flight]:
+        if req.endpoint == "prices_for_dates":
+            return self.prices_for_dates(req.origin, req.destination, req.date, limit=req.limit)
+        if req.endpoint == "latest":
+            return self.latest(req.origin, req.destination, period_type="month",
+                               beginning_of_period=req.date, limit=req.limit)
+        raise ValueError(f"Endpoint desconhecido: {req.endpoint}")
+
+    def batch_fetch(self, reqs: Iterable[BatchRequest], max_workers: int = 8,
+                    rate_per_sec: float = 10.0, burst: int = 5) -> Iterator[BatchResult]:
+        """
+        Dispara as consultas num pool limitado de threads, respeitando o rate limiter,
+        e devolve cada BatchResult assim que chega (ordem de conclusão).
+        Falhas não interrompem o lote: vêm como BatchResult com `error` preenchido.
+        Fechar o iterador cancela as consultas ainda não iniciadas.
+        """
+        limiter = RateLimiter(rate_per_sec, burst)
+
+        def task(req: BatchRequest) -> BatchResult:
+            limiter.acquire()
+            t0 = time.perf_counter()
+            try:
+                flights = self._run_one(req)
+                return BatchResult(req, flights, None, (time.perf_counter() - t0) * 1000)
+            except Exception as e:
+                msg = f"{type(e).__name__}: {e}".replace(self.token, "***")   # não vaza o token em logs
+                return BatchResult(req, [], msg, (time.perf_counter() - t0) * 1000)
+
+        ex = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = [ex.submit(task, r) for r in reqs]
+            for fut in as_completed(futures):
+                yield fut.result()
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    def batch_collect(self, reqs: Iterable[BatchRequest], **kw) -> Tuple[List[Flight], List[BatchResult]]:
+        """Conveniência: junta todos os voos do lote e devolve também a lista de falhas."""
         flights: List[Flight] = []
-        for it in js.get("data", []):
-            price = it.get("value")
-            dep_date = it.get("depart_date")  # YYYY-MM-DD
-            # duration total em minutos, se houver
-            duration = it.get("duration")
-            flights.append(_mk_flight(
-                it.get("origin", origin or "???"),
-                it.get("destination", destination or "???"),
-                airline=it.get("gate") or "N/A",
-                departure_at=dep_date,   # sem hora → "00:00"
-                duration_min=duration,
-                price=price,
-            ))
-        return flights
+        failed: List[BatchResult] = []
+        for res in self.batch_fetch(reqs, **kw):
+            if res.ok:
+                flights.extend(res.flights)
+            else:
+                failed.append(res)
+        return flights, failed
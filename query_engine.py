@@ -0,0 +1,264 @@
+# query_engine.py
+# Núcleo de consultas sem interface gráfica: filtro, ordenação e busca por preço sobre List[Flight].
+# A App (Tk) delega para cá; o mesmo código roda em lote pela linha de comando:
+#   python query_engine.py --csv voos.csv --queries consultas.jsonl --out resultados.jsonl
+#   python query_engine.py --demo 200000 --queries consultas.jsonl --repeat 5
+# Cada linha do arquivo de consultas é um JSON, ex.:
+#   {"id": "q1", "origin": "GRU", "date": "2025-03", "max_price": 900, "sort_key": "duration", "limit": 20}
+#   {"id": "q2", "destination": "LIS", "search_algo": "binary", "search_mode": "<=", "search_value": 2500}
+import sys
+import json
+import time
+import argparse
+from dataclasses import dataclass, field, fields
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from models import Flight
+from algorithms import SortMetrics, SearchMetrics, sort_list, search_by_value, top_k
+from tracing import TRACER
+
+SORT_KEYS = ("price", "depart_time", "duration")
+CHECK_EVERY = 65536          # itens filtrados entre verificações de cancelamento
+
+@dataclass
+class Query:
+    """Parâmetros de uma consulta; strings vazias = sem filtro (mesma semântica dos campos da tela)."""
+    origin: str = ""
+    destination: str = ""
+    airline: str = ""
+    date: str = ""                                  # YYYY, YYYY-MM ou YYYY-MM-DD
+    max_price: Union[str, float, None] = ""
+    sort_key: str = "price"
+    sort_algo: str = "timsort"
+    descending: bool = False
+    search_algo: Optional[str] = None               # "linear" | "binary" (None = sem busca)
+    search_mode: str = "<="
+    search_value: Optional[float] = None
+    limit: Optional[int] = None
+    id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Query":
+        known = {f.name for f in fields(cls)}
+        extra = set(d) - known
+        if extra:
+            raise ValueError(f"Campos desconhecidos na consulta: {sorted(extra)}")
+        q = cls(**d)
+        if q.id is not None:
+            q.id = str(q.id)
+        return q
+
+@dataclass
+class QueryResult:
+    flights: List[Flight]
+    total: int                                      # resultados antes do limit
+    sort_metrics: Optional[SortMetrics] = None
+    search_metrics: Optional[SearchMetrics] = None
+    elapsed_ms: float = 0.0
+    query: Optional[Query] = field(default=None, repr=False)
+
+# ---------------- peças ----------------
+def sort_key_for(name: str) -> Callable[[Flight], object]:
+    if name == "price": return lambda f: f.price
+    if name == "depart_time": return lambda f: (f.date, f.depart_time)
+    if name == "duration": return lambda f: f.duration_minutes
+    return lambda f: f.price
+
+def filter_flights(data: List[Flight], q: Query, token=None) -> List[Flight]:
+    """
+    Aplica origem/destino/companhia/data/preço máximo. `token` (opcional) precisa ter check(),
+    chamado a cada CHECK_EVERY itens para permitir cancelamento cooperativo.
+    """
+    origin, dest, airline = q.origin or "", q.destination or "", q.airline or ""
+    d = (q.date or "").strip()
+    mp = "" if q.max_price is None else str(q.max_price).strip()
+    m = None
+    if mp:
+        try: m = float(mp.replace(",", "."))
+        except ValueError: return []
+    if d and len(d) not in (4, 7, 10):
+        return []
+    def ok(f: Flight) -> bool:
+        if origin and f.origin != origin: return False
+        if dest and f.destination != dest: return False
+        if airline and f.airline != airline: return False
+        if d:
+            if len(d) == 10:
+                if f.date != d: return False
+            elif not f.date.startswith(d): return False
+        if m is not None and f.price > m: return False
+        return True
+    out: List[Flight] = []
+    with TRACER.span("filter", rows_in=len(data)) as sp:
+        for i in range(0, len(data), CHECK_EVERY):
+            if token is not None:
+                token.check()
+            out.extend(f for f in data[i:i + CHECK_EVERY] if ok(f))
+        sp.rows_out = len(out)
+    return out
+
+def sort_flights(data: List[Flight], key_name: str = "price", algo: str = "timsort",
+                 descending: bool = False) -> Tuple[List[Flight], SortMetrics]:
+    with TRACER.span("sort", rows_in=len(data), key=key_name, algo=algo) as sp:
+        out, sm = sort_list(algo, data, sort_key_for(key_name), reverse=descending)
+        sp.rows_out = len(out)
+    return out, sm
+
+def search_price(data: List[Flight], algo: str, mode: str, target: float,
+                 presorted: bool = False, token=None) -> Tuple[List[Flight], SearchMetrics]:
+    """Busca por preço; a binária ordena por preço antes, a menos que `presorted` (crescente)."""
+    with TRACER.span("search", rows_in=len(data), algo=algo, mode=mode) as sp:
+        assume_sorted = False
+        if algo == "binary":
+            if not presorted:
+                with TRACER.span("sort", rows_in=len(data), key="price", algo="timsort"):
+                    data, _ = sort_list("timsort", list(data), key=lambda f: f.price, reverse=False)
+                if token is not None:
+                    token.check()
+            assume_sorted = True
+        out, met = search_by_value(algo, data, key=lambda f: f.price, target=target, mode=mode,
+                                   assume_sorted=assume_sorted)
+        sp.rows_out = len(out)
+    return out, met
+
+def run_query(flights: List[Flight], q: Query, token=None) -> QueryResult:
+    """Filtro → ordenação → busca (opcional) → limit."""
+    t0 = time.perf_counter()
+    with TRACER.span("run_query", rows_in=len(flights), id=q.id) as sp:
+        data = filter_flights(flights, q, token)
+        if token is not None:
+            token.check()
+        data, sm = sort_flights(data, q.sort_key, q.sort_algo, q.descending)
+        met = None
+        if q.search_algo and q.search_value is not None:
+            presorted = q.sort_key == "price" and not q.descending
+            data, met = search_price(data, q.search_algo, q.search_mode, float(q.search_value), presorted, token)
+        total = len(data)
+        if q.limit is not None:
+            data = data[:max(0, int(q.limit))]
+        sp.rows_out = len(data)
+    return QueryResult(data, total, sm, met, (time.perf_counter() - t0) * 1000, q)
+
+def top_flights(flights: List[Flight], q: Query, k: int, token=None) -> QueryResult:
+    """Filtro → k melhores por `q.sort_key` com heap (sem ordenar o resultado inteiro)."""
+    t0 = time.perf_counter()
+    with TRACER.span("top_flights", rows_in=len(flights), k=k) as sp:
+        data = filter_flights(flights, q, token)
+        if token is not None:
+            token.check()
+        with TRACER.span("top_k", rows_in=len(data)):
+            best, sm = top_k(data, sort_key_for(q.sort_key), k, reverse=q.descending)
+        sp.rows_out = len(best)
+    return QueryResult(best, len(data), sm, None, (time.perf_counter() - t0) * 1000, q)
+
+class QueryEngine:
+    """Mantém o dataset carregado uma vez e executa consultas sobre ele."""
+    def __init__(self, flights: List[Flight]):
+        self.flights = flights
+
+    def run(self, q: Union[Query, dict], token=None) -> QueryResult:
+        if isinstance(q, dict):
+            q = Query.from_dict(q)
+        return run_query(self.flights, q, token)
+
+    def run_many(self, queries: Iterable[Union[Query, dict]]) -> Iterator[QueryResult]:
+        for q in queries:
+            yield self.run(q)
+
+# ---------------- CLI ----------------
+def read_queries(lines: Iterable[str]) -> List[Query]:
+    out: List[Query] = []
+    for n, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            out.append(Query.from_dict(json.loads(line)))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Consulta inválida na linha {n}: {e}") from e
+    return out
+
+def flight_to_dict(f: Flight) -> dict:
+    return {"flight_id": f.flight_id, "airline": f.airline, "origin": f.origin, "destination": f.destination,
+            "date": f.date, "depart_time": f.depart_time, "arrive_time": f.arrive_time,
+            "duration": f.duration_minutes, "price": f.price}
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+def main(argv: Optional[List[str]] = None):
+    import data_loader as dl
+
+    ap = argparse.ArgumentParser(description="Executa consultas JSON-lines sobre um dataset de voos.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--csv", help="CSV no formato do app (flight_id,airline,...)")
+    src.add_argument("--demo", type=int, help="gera N voos sintéticos")
+    ap.add_argument("--queries", default="-", help="arquivo .jsonl de consultas ('-' = stdin)")
+    ap.add_argument("--out", default=None, help="grava um JSON por consulta (padrão: stdout)")
+    ap.add_argument("--top", type=int, default=10, help="voos incluídos por resultado")
+    ap.add_argument("--repeat", type=int, default=1, help="repete o lote (medição de vazão)")
+    ap.add_argument("--shards", type=int, default=0, help="particiona em N processos (scatter/gather)")
+    ap.add_argument("--shard-by", choices=["route", "date"], default="route")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    flights = dl.parse_csv(args.csv) if args.csv else dl.generate_synthetic(n=args.demo, days=60)
+    load_s = time.perf_counter() - t0
+    try:
+        if args.queries == "-":
+            queries = read_queries(sys.stdin)
+        else:
+            with open(args.queries, encoding="utf-8") as f:
+                queries = read_queries(f)
+    except (OSError, ValueError) as e:
+        ap.error(str(e))
+
+    if args.shards > 1:
+        from sharded import ShardManager
+        engine = ShardManager(flights, shards=args.shards, by=args.shard_by)
+        print(f"{args.shards} shards por {args.shard_by} carregados em {engine.load_ms:.0f} ms", file=sys.stderr)
+    else:
+        engine = QueryEngine(flights)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    lat: List[float] = []
+    t0 = time.perf_counter()
+    try:
+        for rnd in range(max(1, args.repeat)):
+            for res in engine.run_many(queries):
+                lat.append(res.elapsed_ms)
+                if rnd:
+                    continue          # repetições só medem; o resultado sai uma vez
+                rec = {"id": res.query.id, "total": res.total, "latency_ms": round(res.elapsed_ms, 3),
+                       "flights": [flight_to_dict(f) for f in res.flights[:args.top]]}
+                if res.search_metrics is not None:
+                    rec["search"] = res.search_metrics.details
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if hasattr(engine, "close"):
+            engine.close()
+    wall = time.perf_counter() - t0
+    lat.sort()
+    rep = {
+        "flights": len(flights),
+        "queries": len(lat),
+        "load_s": load_s,
+        "wall_s": wall,
+        "qps": len(lat) / wall if wall else 0.0,
+        "p50_ms": _pct(lat, 0.5),
+        "p99_ms": _pct(lat, 0.99),
+        "max_ms": lat[-1] if lat else 0.0,
+    }
+    err = sys.stderr
+    print("\n--- CONSULTAS EM LOTE ---", file=err)
+    print(f"voos={rep['flights']} (carga {rep['load_s']:.2f}s) consultas={rep['queries']}", file=err)
+    print(f"tempo={rep['wall_s']:.2f}s vazão={rep['qps']:.1f} consultas/s", file=err)
+    print(f"latência p50={rep['p50_ms']:.2f} ms p99={rep['p99_ms']:.2f} ms máx={rep['max_ms']:.2f} ms", file=err)
+    print("-------------------------\n", file=err)
+    return rep
+
+if __name__ == "__main__":
+    main()
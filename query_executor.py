@@ -0,0 +1,126 @@
+# query_executor.py
+# Executa filtro/ordenação/busca fora da thread do Tk. Consultas novas de um mesmo canal
+# cancelam as antigas; resultados voltam para a thread principal via after() (fila + polling),
+# já que widgets Tk só podem ser tocados pela thread principal.
+import sys
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+class QueryCancelled(Exception):
+    """Levantada por CancelToken.check() quando uma consulta mais nova substituiu esta."""
+
+class CancelToken:
+    __slots__ = ("_event",)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise QueryCancelled()
+
+class QueryExecutor:
+    """
+    submit(canal, fn, on_done, on_error): roda fn(token) num pool; ao terminar, on_done(resultado)
+    é chamado na thread do Tk — só se ainda for a consulta mais recente daquele canal.
+    """
+    def __init__(self, root, max_workers: int = 2, poll_ms: int = 30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self._inbox: "queue.Queue[Callable[[], None]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._latest: Dict[str, int] = {}
+        self._tokens: Dict[str, CancelToken] = {}
+        self._debounce: Dict[str, str] = {}
+        self.cancelled = 0
+        self._closed = False
+        root.after(poll_ms, self._drain)
+
+    # ---------- thread principal ----------
+    def _drain(self):
+        try:
+            while True:
+                try:
+                    fn = self._inbox.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    fn()
+                except Exception:
+                    # um callback com erro não pode parar a fila: reporta como o Tk faria e segue
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if not self._closed:
+                self.root.after(self.poll_ms, self._drain)
+
+    def post(self, fn: Callable[[], None]):
+        """Agenda fn na thread do Tk (seguro de chamar de qualquer thread)."""
+        self._inbox.put(fn)
+
+    def debounce(self, key: str, delay_ms: int, fn: Callable[[], None]):
+        """Executa fn após `delay_ms` sem novas chamadas com a mesma chave (usar na thread do Tk)."""
+        old = self._debounce.pop(key, None)
+        if old is not None:
+            self.root.after_cancel(old)
+
+        def fire():
+            self._debounce.pop(key, None)
+            fn()
+        self._debounce[key] = self.root.after(delay_ms, fire)
+
+    # ---------- submissão ----------
+    def submit(self, channel: str, fn: Callable[[CancelToken], Any],
+               on_done: Callable[[Any], None], on_error: Optional[Callable[[BaseException], None]] = None) -> CancelToken:
+        token = CancelToken()
+        with self._lock:
+            gen = self._latest.get(channel, 0) + 1
+            self._latest[channel] = gen
+            old = self._tokens.get(channel)
+            if old is not None and not old.cancelled:
+                old.cancel()
+                self.cancelled += 1
+            self._tokens[channel] = token
+
+        def is_current() -> bool:
+            with self._lock:
+                return self._latest.get(channel) == gen
+
+        def run():
+            try:
+                token.check()
+                result = fn(token)
+            except QueryCancelled:
+                return
+            except BaseException as e:
+                if on_error is not None and is_current():
+                    self.post(lambda e=e: on_error(e) if is_current() else None)
+                return
+            if is_current():
+                self.post(lambda: on_done(result) if is_current() and not token.cancelled else None)
+
+        self._pool.submit(run)
+        return token
+
+    def cancel(self, channel: str):
+        with self._lock:
+            self._latest[channel] = self._latest.get(channel, 0) + 1
+            tok = self._tokens.pop(channel, None)
+        if tok is not None:
+            tok.cancel()
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            for tok in self._tokens.values():
+                tok.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,474 @@
+# query_service.py
+# Serviço HTTP/JSON local (só loopback) sobre um dataset em memória, para vários analistas
+# consultarem a mesma cópia dos dados. Leitores concorrentes rodam num pool de threads; uma nova
+# versão do dataset é montada à parte e trocada por referência (copy-on-write), sem travar consultas.
+# Uso: python query_service.py --csv voos.csv --port 8780 --workers 8
+#
+# Endpoints (GET com query string ou POST com corpo JSON; campos = query_engine.Query):
+#   /filter   ?origin=GRU&date=2025-03&max_price=900&limit=50
+#   /sort     ?destination=LIS&sort_key=duration&sort_algo=mergesort&descending=1&limit=20
+#   /topk     ?k=10&sort_key=price&origin=GRU
+#   /search   ?search_algo=binary&search_mode=<=&search_value=500
+#   /query    consulta completa (filtro → ordenação → busca → limit)
+#   /health, /metrics
+#   POST /reload   {"csv": "..."} | {"snapshot": "nome"} | {"demo": 50000} | {"provider": {"origin": "GRU", "month": "2025-03"}}
+#   POST /snapshot {"name": "..."}   grava a versão atual em <snapshot-dir>/<nome>.json para recarga rápida
+# POSTs exigem Content-Type: application/json e todo pedido precisa de Host local: uma página
+# qualquer no navegador não consegue disparar recarga/snapshot contra o serviço (CSRF, DNS rebinding).
+import re
+import json
+import time
+import socket
+import argparse
+import threading
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models import Flight
+from sketches import KLLSketch
+from query_engine import (Query, QueryResult, SORT_KEYS, filter_flights, run_query, top_flights,
+                          search_price, flight_to_dict)
+
+CONFIG_PATH = Path(__file__).resolve().with_name("config.json")
+SNAPSHOT_DIR = Path(__file__).resolve().with_name("snapshots")
+MAX_LIMIT = 5000             # teto de voos serializados por resposta
+SORT_ALGOS = ("timsort", "mergesort", "quicksort")     # O(n log n): os quadráticos prenderiam um worker
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+_SNAPSHOT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+class Forbidden(Exception):
+    """Pedido recusado (403): Host não local ou POST sem JSON."""
+
+# ---------------- dataset versionado ----------------
+@dataclass(frozen=True)
+class Dataset:
+    """Versão imutável do dataset; `by_price` é o índice ordenado usado pela busca binária."""
+    version: int
+    flights: List[Flight]
+    by_price: List[Flight]
+    source: str
+    loaded_at: float
+    build_ms: float
+
+class DatasetStore:
+    """
+    `current` é só uma referência: cada requisição a lê uma vez e trabalha sobre aquela versão.
+    `swap` monta a versão nova (índices inclusos) fora do lock e apenas troca a referência.
+    """
+    def __init__(self, flights: Optional[List[Flight]] = None, source: str = "vazio"):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.current: Dataset = self._build(list(flights or []), source, 0)
+
+    @staticmethod
+    def _build(flights: List[Flight], source: str, version: int) -> Dataset:
+        t0 = time.perf_counter()
+        by_price = sorted(flights, key=lambda f: f.price)
+        return Dataset(version, flights, by_price, source, time.time(), (time.perf_counter() - t0) * 1000)
+
+    def swap(self, flights: List[Flight], source: str) -> Dataset:
+        with self._lock:
+            self._version += 1
+            version = self._version
+        ds = self._build(list(flights), source, version)
+        with self._lock:
+            if ds.version > self.current.version:      # recargas concorrentes: vence a mais nova
+                self.current = ds
+        return ds
+
+    @property
+    def loading(self) -> Optional[str]:
+        return self._loading
+
+    def reload_async(self, loader: Callable[[], List[Flight]], source: str) -> bool:
+        """Carrega numa thread e troca ao terminar; False se já houver uma recarga em curso."""
+        with self._lock:
+            if self._loading is not None:
+                return False
+            self._loading = source
+
+        def work():
+            try:
+                self.swap(loader(), source)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{source}: {e}"
+            finally:
+                with self._lock:
+                    self._loading = None
+        threading.Thread(target=work, daemon=True).start()
+        return True
+
+# ---------------- fontes ----------------
+def snapshot_path(name: str, directory: Path = SNAPSHOT_DIR) -> Path:
+    """Só nomes simples dentro do diretório de snapshots (nada de caminhos vindos do cliente)."""
+    name = str(name or "").removesuffix(".json")
+    if not _SNAPSHOT_NAME.match(name):
+        raise ValueError("Nome de snapshot inválido (use letras, números, '_', '-' e '.').")
+    return Path(directory) / f"{name}.json"
+
+def save_snapshot(path: Path, flights: List[Flight]):
+    """JSON (uma lista por voo), não pickle: carregar um snapshot nunca executa código."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [[f.flight_id, f.airline, f.origin, f.destination, f.date, f.depart_time, f.arrive_time, f.price]
+            for f in flights]
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(rows, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(path)
+
+def load_snapshot(path: Path) -> List[Flight]:
+    rows = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(rows, list):
+        raise ValueError(f"Snapshot inválido: {path.name}")
+    return [Flight(str(r[0]), str(r[1]), str(r[2]), str(r[3]), str(r[4]), str(r[5]), str(r[6]), float(r[7]))
+            for r in rows]
+
+def load_provider(origin: Optional[str] = None, destination: Optional[str] = None, month: Optional[str] = None,
+                  max_results: int = 2000, token: Optional[str] = None) -> List[Flight]:
+    """v2/latest do Travelpayouts (token do config.json se não informado)."""
+    from providers import TravelpayoutsClient        # stack de rede só quando usada
+    if not token:
+        try:
+            token = json.loads(CONFIG_PATH.read_text(encoding="utf-8")).get("travelpayouts_token")
+        except (OSError, ValueError):
+            token = None
+    if not token:
+        raise ValueError("Token do Travelpayouts ausente (config.json ou campo 'token').")
+    month_start = f"{(month or time.strftime('%Y-%m'))[:7]}-01"
+    cli = TravelpayoutsClient(token=token)
+    return list(cli.iter_latest(origin or None, destination or None, period_type="month",
+                                beginning_of_period=month_start, page_size=200,
+                                max_results=max_results, prefetch=2))
+
+def make_loader(spec: dict, snapshot_dir: Path = SNAPSHOT_DIR) -> Tuple[Callable[[], List[Flight]], str]:
+    """{"csv"|"snapshot"|"demo"|"provider": ...} → (função de carga, descrição da fonte)."""
+    import data_loader as dl
+    if "csv" in spec:
+        return (lambda: dl.parse_csv(spec["csv"])), f"csv:{spec['csv']}"
+    if "snapshot" in spec:
+        path = snapshot_path(spec["snapshot"], snapshot_dir)
+        return (lambda: load_snapshot(path)), f"snapshot:{path.stem}"
+    if "demo" in spec:
+        n = int(spec["demo"])
+        return (lambda: dl.generate_synthetic(n=n, days=60)), f"demo:{n}"
+    if "provider" in spec:
+        p = dict(spec["provider"] or {})
+        tag = f"{p.get('origin') or '*'}-{p.get('destination') or '*'}-{p.get('month') or 'atual'}"
+        return (lambda: load_provider(**p)), f"travelpayouts:{tag}"
+    raise ValueError("Informe 'csv', 'snapshot', 'demo' ou 'provider'.")
+
+# ---------------- métricas por endpoint ----------------
+@dataclass
+class EndpointStats:
+    count: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    sketch: KLLSketch = field(default_factory=lambda: KLLSketch(k=200))
+
+class ServiceMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_endpoint: Dict[str, EndpointStats] = {}
+        self.in_flight = 0
+        self.started = time.time()
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, endpoint: str, ms: float, ok: bool):
+        with self._lock:
+            self.in_flight -= 1
+            st = self._by_endpoint.get(endpoint)
+            if st is None:
+                st = self._by_endpoint[endpoint] = EndpointStats()
+            st.count += 1
+            st.errors += 0 if ok else 1
+            st.total_ms += ms
+            st.max_ms = max(st.max_ms, ms)
+            st.sketch.update(ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, st in sorted(self._by_endpoint.items()):
+                p50, p90, p99 = st.sketch.quantiles((0.5, 0.9, 0.99))
+                out[name] = {"count": st.count, "errors": st.errors,
+                             "mean_ms": st.total_ms / st.count if st.count else 0.0,
+                             "p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "max_ms": st.max_ms}
+            return {"uptime_s": time.time() - self.started, "in_flight": self.in_flight, "endpoints": out}
+
+# ---------------- parâmetros ----------------
+_TRUE = {"1", "true", "yes", "sim", "on"}
+
+def _coerce(params: dict) -> Tuple[Query, dict]:
+    """Query string/JSON → (Query, extras). Valores da query string chegam como texto."""
+    p = dict(params)
+    extra = {k: p.pop(k) for k in ("k",) if k in p}
+    if isinstance(p.get("descending"), str):
+        p["descending"] = p["descending"].strip().lower() in _TRUE
+    for k in ("limit",):
+        if p.get(k) not in (None, ""):
+            p[k] = int(p[k])
+    if p.get("search_value") not in (None, ""):
+        p["search_value"] = float(str(p["search_value"]).replace(",", "."))
+    q = Query.from_dict(p)
+    if q.sort_key not in SORT_KEYS:
+        raise ValueError(f"sort_key deve ser um de {list(SORT_KEYS)}")
+    if str(q.sort_algo).lower() not in SORT_ALGOS:
+        raise ValueError(f"sort_algo deve ser um de {list(SORT_ALGOS)}")
+    return q, extra
+
+def _capped(q: Query) -> int:
+    return MAX_LIMIT if q.limit is None else min(max(0, q.limit), MAX_LIMIT)
+
+def _payload(ds: Dataset, res: QueryResult, limit: int) -> dict:
+    out = {"version": ds.version, "total": res.total, "elapsed_ms": round(res.elapsed_ms, 3),
+           "flights": [flight_to_dict(f) for f in res.flights[:limit]]}
+    out["returned"] = len(out["flights"])
+    if res.sort_metrics is not None:
+        out["sort"] = asdict(res.sort_metrics)
+    if res.search_metrics is not None:
+        out["search"] = asdict(res.search_metrics)
+    return out
+
+# ---------------- consultas ----------------
+def ep_filter(ds: Dataset, q: Query, extra: dict) -> dict:
+    t0 = time.perf_counter()
+    data = filter_flights(ds.flights, q)
+    return _payload(ds, QueryResult(data, len(data), elapsed_ms=(time.perf_counter() - t0) * 1000), _capped(q))
+
+def ep_sort(ds: Dataset, q: Query, extra: dict) -> dict:
+    q.search_algo = None
+    return _payload(ds, run_query(ds.flights, q), _capped(q))
+
+def ep_topk(ds: Dataset, q: Query, extra: dict) -> dict:
+    k = min(max(1, int(extra.get("k") or q.limit or 10)), MAX_LIMIT)
+    return _payload(ds, top_flights(ds.flights, q, k), k)
+
+def _no_filters(q: Query) -> bool:
+    return not (q.origin or q.destination or q.airline or (q.date or "").strip()
+                or str(q.max_price or "").strip())
+
+def ep_search(ds: Dataset, q: Query, extra: dict) -> dict:
+    if q.search_value is None:
+        raise ValueError("Informe search_value.")
+    q.search_algo = q.search_algo or "binary"
+    if _no_filters(q):
+        # sem filtros: busca direto no índice por preço da versão (já ordenado)
+        t0 = time.perf_counter()
+        data, met = search_price(ds.by_price, q.search_algo, q.search_mode, q.search_value, presorted=True)
+        res = QueryResult(data, len(data), None, met, (time.perf_counter() - t0) * 1000, q)
+    else:
+        q.sort_key, q.descending = "price", False
+        res = run_query(ds.flights, q)
+    return _payload(ds, res, _capped(q))
+
+def ep_query(ds: Dataset, q: Query, extra: dict) -> dict:
+    return _payload(ds, run_query(ds.flights, q), _capped(q))
+
+QUERY_ENDPOINTS: Dict[str, Callable[[Dataset, Query, dict], dict]] = {
+    "/filter": ep_filter,
+    "/sort": ep_sort,
+    "/topk": ep_topk,
+    "/search": ep_search,
+    "/query": ep_query,
+}
+
+def _dataset_info(store: DatasetStore) -> dict:
+    ds = store.current
+    return {"version": ds.version, "flights": len(ds.flights), "source": ds.source,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ds.loaded_at)),
+            "index_build_ms": round(ds.build_ms, 2), "loading": store.loading, "last_error": store.last_error}
+
+# ---------------- HTTP ----------------
+def _local_host_header(value: Optional[str]) -> bool:
+    host = (value or "").strip().lower()
+    if host.startswith("["):                  # [::1]:8780
+        host = host[1:].split("]", 1)[0]
+    elif host.count(":") == 1:
+        host = host.split(":", 1)[0]
+    return host in LOCAL_HOSTS
+
+def _handler(store: DatasetStore, metrics: ServiceMetrics, snapshot_dir: Path = SNAPSHOT_DIR):
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.0 (uma requisição por conexão): conexões ociosas não prendem threads do pool
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> dict:
+            ctype = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+            if ctype != "application/json":
+                raise Forbidden("POST exige Content-Type: application/json.")
+            n = int(self.headers.get("Content-Length") or 0)
+            if not n:
+                return {}
+            data = json.loads(self.rfile.read(n).decode("utf-8"))
+            if not isinstance(data, dict):
+                raise ValueError("Corpo JSON deve ser um objeto.")
+            return data
+
+        def _dispatch(self, method: str):
+            u = urlparse(self.path)
+            path = u.path.rstrip("/") or "/"
+            metrics.begin()
+            t0 = time.perf_counter()
+            code = 500
+            try:
+                if not _local_host_header(self.headers.get("Host")):
+                    raise Forbidden("Host não local.")
+                code, payload = self._route(method, path, u.query)
+            except Forbidden as e:
+                code, payload = 403, {"error": str(e)}
+            except (ValueError, TypeError) as e:
+                code, payload = 400, {"error": str(e)}
+            except Exception as e:
+                code, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+            finally:
+                metrics.record(path if code != 404 else "(404)", (time.perf_counter() - t0) * 1000, code < 400)
+            self._send(code, payload)
+
+        def _route(self, method: str, path: str, query: str) -> Tuple[int, dict]:
+            if path in QUERY_ENDPOINTS:
+                params = self._body() if method == "POST" else {k: v[-1] for k, v in parse_qs(query).items()}
+                q, extra = _coerce(params)
+                return 200, QUERY_ENDPOINTS[path](store.current, q, extra)
+            if path == "/health" and method == "GET":
+                return 200, {"ok": True, **_dataset_info(store)}
+            if path == "/metrics" and method == "GET":
+                return 200, {**metrics.snapshot(), "dataset": _dataset_info(store)}
+            if path == "/reload" and method == "POST":
+                loader, source = make_loader(self._body(), snapshot_dir)
+                if not store.reload_async(loader, source):
+                    return 409, {"error": f"Recarga em andamento: {store.loading}"}
+                return 202, {"loading": source, "current_version": store.current.version}
+            if path == "/snapshot" and method == "POST":
+                target = snapshot_path(self._body().get("name"), snapshot_dir)
+                ds = store.current
+                save_snapshot(target, ds.flights)
+                return 200, {"name": target.stem, "version": ds.version, "flights": len(ds.flights)}
+            return 404, {"error": "not found"}
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_POST(self):
+            self._dispatch("POST")
+    return Handler
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer que atende cada conexão num ThreadPoolExecutor de tamanho fixo."""
+    def __init__(self, address, handler, workers: int = 8):
+        super().__init__(address, handler)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query-http")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+def _require_loopback(host: str):
+    try:
+        addr = ipaddress.ip_address(socket.gethostbyname(host))
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Host inválido: {host}") from e
+    if not addr.is_loopback:
+        raise ValueError(f"O serviço só escuta em localhost (recebido {host}).")
+
+class QueryService:
+    """Sobe o serviço numa thread; `base_url` aponta para o endereço local."""
+    def __init__(self, store: DatasetStore, host: str = "127.0.0.1", port: int = 0, workers: int = 8,
+                 snapshot_dir: Path = SNAPSHOT_DIR):
+        _require_loopback(host)
+        self.store = store
+        self.metrics = ServiceMetrics()
+        self.httpd = PooledHTTPServer((host, port), _handler(store, self.metrics, Path(snapshot_dir)), workers)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "QueryService":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Serviço local de consultas de voos (HTTP/JSON).")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--csv")
+    src.add_argument("--snapshot", metavar="NOME", help="snapshot salvo em --snapshot-dir")
+    src.add_argument("--demo", type=int)
+    src.add_argument("--provider", metavar="ORIG:DEST:YYYY-MM", help="ex.: GRU::2025-03 (campos vazios = qualquer)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8780)
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--snapshot-dir", default=str(SNAPSHOT_DIR))
+    args = ap.parse_args(argv)
+
+    spec: dict = {}
+    if args.csv: spec = {"csv": args.csv}
+    elif args.snapshot: spec = {"snapshot": args.snapshot}
+    elif args.demo: spec = {"demo": args.demo}
+    elif args.provider:
+        o, d, m = (args.provider.split(":") + ["", "", ""])[:3]
+        spec = {"provider": {"origin": o, "destination": d, "month": m}}
+
+    store = DatasetStore()
+    if spec:
+        loader, source = make_loader(spec, Path(args.snapshot_dir))
+        t0 = time.perf_counter()
+        store.swap(loader(), source)
+        print(f"Dataset '{source}': {len(store.current.flights)} voos em {time.perf_counter() - t0:.2f}s")
+    try:
+        srv = QueryService(store, args.host, args.port, args.workers, args.snapshot_dir)
+    except ValueError as e:
+        ap.error(str(e))
+    print(f"Serviço de consultas em {srv.base_url} ({args.workers} workers). Ctrl+C para sair.")
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
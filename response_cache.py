@@ -0,0 +1,186 @@
+# response_cache.py
+# Cache em disco das respostas do Travelpayouts, já convertidas em List[Flight].
+# Chave = URL base + endpoint + parâmetros normalizados (sem o token); TTL por endpoint,
+# remoção LRU por tamanho total e stale-while-revalidate.
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from models import Flight
+
+# Os dados v2 já vêm com ~48h de cache no servidor; v3 é mais "fresco".
+DEFAULT_TTLS = {
+    "latest": 6 * 3600,
+    "prices_for_dates": 3600,
+}
+EXCLUDED_PARAMS = {"token"}
+
+def cache_key(endpoint: str, params: Dict[str, Any], base: str = "") -> str:
+    """`base` separa servidores diferentes (API real x servidor local) que compartilham o diretório."""
+    norm = sorted((k, str(v).strip().upper() if k in ("origin", "destination") else str(v).strip())
+                  for k, v in params.items() if k not in EXCLUDED_PARAMS)
+    raw = base.rstrip("/") + "/" + endpoint + "?" + "&".join(f"{k}={v}" for k, v in norm)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Um arquivo pickle por chave em `directory`; o índice LRU (chave → tamanho)
+    é reconstruído do disco na inicialização, usando o mtime como último acesso.
+    Estados de `lookup`: "fresh" (idade < ttl), "stale" (ttl ≤ idade < ttl + stale_window), "miss".
+    """
+    def __init__(self, directory: str | Path, max_bytes: int = 64 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None, default_ttl: float = 3600,
+                 stale_window: float = 24 * 3600):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.stale_window = stale_window
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()   # chave → bytes
+        self._bytes = 0
+        self._refreshing: set = set()
+        self.hits = self.stale_hits = self.misses = self.evictions = self.revalidations = 0
+        self._load_index()
+
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}.pkl"
+
+    def _load_index(self):
+        entries = []
+        for p in self.dir.glob("*.pkl"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, p.stem, st.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    def _ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    # ---------- leitura / escrita ----------
+    def lookup(self, endpoint: str, params: Dict[str, Any],
+               base: str = "") -> Tuple[Optional[List[Flight]], str]:
+        key = cache_key(endpoint, params, base)
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None, "miss"
+        try:
+            with open(self._path(key), "rb") as f:
+                stored_at, flights = pickle.load(f)
+            os.utime(self._path(key))            # persiste a ordem LRU entre execuções
+        except Exception:
+            self._drop(key)
+            with self._lock:
+                self.misses += 1
+            return None, "miss"
+        age = time.time() - stored_at
+        ttl = self._ttl(endpoint)
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            if age < ttl:
+                self.hits += 1
+                return list(flights), "fresh"
+            if age < ttl + self.stale_window:
+                self.stale_hits += 1
+                return list(flights), "stale"
+            self.misses += 1
+        self._drop(key)
+        return None, "miss"
+
+    def put(self, endpoint: str, params: Dict[str, Any], flights: List[Flight], base: str = ""):
+        key = cache_key(endpoint, params, base)
+        data = pickle.dumps((time.time(), list(flights)), protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = self.dir / f"{key}.{threading.get_ident()}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self._path(key))        # escrita atômica
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old:
+                self._bytes -= old
+            self._index[key] = len(data)
+            self._bytes += len(data)
+            victims = []
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                k, size = self._index.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+                victims.append(k)
+        for k in victims:
+            self._path(k).unlink(missing_ok=True)
+
+    def _drop(self, key: str):
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old:
+                self._bytes -= old
+        self._path(key).unlink(missing_ok=True)
+
+    def get_or_fetch(self, endpoint: str, params: Dict[str, Any],
+                     fetch: Callable[[], List[Flight]], base: str = "") -> List[Flight]:
+        """
+        fresh → devolve do disco; stale → devolve do disco e revalida em background;
+        miss → chama `fetch` (HTTP + parse) e grava.
+        """
+        flights, state = self.lookup(endpoint, params, base)
+        if state == "fresh":
+            return flights
+        if state == "stale":
+            self._revalidate(endpoint, params, fetch, base)
+            return flights
+        flights = fetch()
+        self.put(endpoint, params, flights, base)
+        return flights
+
+    def _revalidate(self, endpoint: str, params: Dict[str, Any], fetch: Callable[[], List[Flight]],
+                    base: str = ""):
+        key = cache_key(endpoint, params, base)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.revalidations += 1
+
+        def work():
+            try:
+                self.put(endpoint, params, fetch(), base)
+            except Exception:
+                pass                              # mantém a entrada antiga; tenta de novo no próximo acesso
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._index)
+            self._index.clear()
+            self._bytes = 0
+        for k in keys:
+            self._path(k).unlink(missing_ok=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.stale_hits) / total if total else 0.0,
+                "evictions": self.evictions,
+                "revalidations": self.revalidations,
+            }
@@ -0,0 +1,263 @@
+# routes.py
+# Grafo de rotas expandido no tempo para buscar conexões (ex.: GRU→LIS→CDG).
+# O índice é construído uma vez por dataset e reutilizado entre consultas.
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Iterable
+from datetime import datetime, date
+from bisect import bisect_left
+import heapq
+import time
+
+from models import Flight
+from algorithms import SearchMetrics
+
+INF = float("inf")
+
+def _to_minutes(date_str: str, hhmm: str) -> int:
+    """Minutos absolutos (ordinal do dia * 1440 + minuto do dia)."""
+    d = date.fromisoformat(date_str)
+    hh, mm = hhmm.split(":")[:2]
+    return d.toordinal() * 1440 + int(hh) * 60 + int(mm)
+
+def _start_minutes(depart_after) -> int:
+    """Aceita datetime, date, 'YYYY-MM-DD' ou 'YYYY-MM-DD HH:MM'."""
+    if isinstance(depart_after, datetime):
+        return depart_after.date().toordinal() * 1440 + depart_after.hour * 60 + depart_after.minute
+    if isinstance(depart_after, date):
+        return depart_after.toordinal() * 1440
+    s = str(depart_after).strip().replace("T", " ")
+    if len(s) == 10:
+        return _to_minutes(s, "00:00")
+    d, t = s.split(" ", 1)
+    return _to_minutes(d, t[:5])
+
+@dataclass
+class Itinerary:
+    legs: List[Flight]
+
+    @property
+    def origin(self) -> str:
+        return self.legs[0].origin
+
+    @property
+    def destination(self) -> str:
+        return self.legs[-1].destination
+
+    @property
+    def price(self) -> float:
+        return sum(f.price for f in self.legs)
+
+    @property
+    def n_legs(self) -> int:
+        return len(self.legs)
+
+    @property
+    def depart_datetime(self) -> datetime:
+        return self.legs[0].depart_datetime
+
+    @property
+    def arrive_datetime(self) -> datetime:
+        return self.legs[-1].arrive_datetime
+
+    @property
+    def duration_minutes(self) -> int:
+        return int((self.arrive_datetime - self.depart_datetime).total_seconds() // 60)
+
+    @property
+    def stops(self) -> List[str]:
+        return [f.destination for f in self.legs[:-1]]
+
+    def describe(self) -> str:
+        path = "→".join([self.origin] + [f.destination for f in self.legs])
+        return (f"{path} | {self.depart_datetime:%Y-%m-%d %H:%M} → {self.arrive_datetime:%Y-%m-%d %H:%M} "
+                f"| {self.n_legs} trecho(s) | {self.price:.2f}")
+
+class RouteGraph:
+    """
+    Índice de conexões:
+      - conns: todos os trechos ordenados por partida (para o Connection Scan)
+      - departures[aeroporto]: índices dos trechos que partem dali, ordenados por horário
+    Tempos são guardados como minutos absolutos (int) para evitar datetime no laço quente.
+    """
+    def __init__(self, flights: Iterable[Flight], min_layover: int = 60, max_layover: int = 24 * 60):
+        self.min_layover = min_layover
+        self.max_layover = max_layover
+        legs = []
+        for f in flights:
+            try:
+                dep = _to_minutes(f.date, f.depart_time)
+                arr = _to_minutes(f.date, f.arrive_time)
+            except (ValueError, AttributeError):
+                continue
+            if arr < dep:
+                arr += 1440
+            legs.append((dep, arr, f))
+        legs.sort(key=lambda x: x[0])
+        self.flights: List[Flight] = [x[2] for x in legs]
+        self.dep: List[int] = [x[0] for x in legs]
+        self.arr: List[int] = [x[1] for x in legs]
+        self.org: List[str] = [f.origin for f in self.flights]
+        self.dst: List[str] = [f.destination for f in self.flights]
+        self.price: List[float] = [f.price for f in self.flights]
+        self.max_leg = max((a - d for d, a in zip(self.dep, self.arr)), default=0)   # trecho mais longo (min)
+
+        self.departures: Dict[str, List[int]] = {}
+        for i, o in enumerate(self.org):
+            self.departures.setdefault(o, []).append(i)   # já em ordem de partida
+        self._dep_times: Dict[str, List[int]] = {a: [self.dep[i] for i in idx] for a, idx in self.departures.items()}
+
+    def __len__(self):
+        return len(self.flights)
+
+    @property
+    def airports(self) -> List[str]:
+        return sorted(set(self.org) | set(self.dst))
+
+    # ---------- Connection Scan (chegada mais cedo / menos trechos) ----------
+    def _scan(self, origin: str, destination: str, start: int, end: int, max_connections: int,
+              min_layover: int, stop_at_target: bool = True):
+        """
+        CSA com rótulos por número de trechos: best[k][aeroporto] = chegada mais cedo usando k trechos.
+        O 1º trecho parte em [start, end); a varredura termina no horizonte em que nenhum itinerário
+        válido ainda pode partir e, com `stop_at_target`, quando a partida passa da melhor chegada ao destino.
+        """
+        K = max_connections + 1
+        best: List[Dict[str, int]] = [dict() for _ in range(K + 1)]
+        parent: List[Dict[str, int]] = [dict() for _ in range(K + 1)]
+        best[0][origin] = start - min_layover      # permite embarcar já em `start`
+        target_best = INF
+        # último trecho parte no máximo K-1 vezes (trecho mais longo + espera máxima) depois do 1º
+        horizon = end + (K - 1) * (self.max_leg + self.max_layover)
+        comps = 0
+        dep, arr, org, dst = self.dep, self.arr, self.org, self.dst
+        for c in range(bisect_left(dep, start), len(dep)):
+            d = dep[c]
+            if d > horizon or (stop_at_target and d > target_best):
+                break
+            o = org[c]
+            comps += 1
+            for k in range(1, K + 1):
+                t = best[k - 1].get(o)
+                if t is None:
+                    continue
+                if k == 1:
+                    if d >= end:
+                        continue
+                elif t + min_layover > d or d - t > self.max_layover:
+                    continue
+                a = arr[c]; x = dst[c]
+                if a < best[k].get(x, INF):
+                    best[k][x] = a
+                    parent[k][x] = c
+                    if x == destination and a < target_best:
+                        target_best = a
+        return best, parent, comps
+
+    def _unwind(self, parent, k: int, destination: str) -> List[Flight]:
+        legs = []
+        stop = destination
+        while k > 0:
+            c = parent[k][stop]
+            legs.append(self.flights[c])
+            stop = self.org[c]
+            k -= 1
+        legs.reverse()
+        return legs
+
+    def _window(self, depart_after, depart_before) -> Tuple[int, int]:
+        """Janela de partida do 1º trecho (padrão: 1 dia, como em `cheapest`)."""
+        start = _start_minutes(depart_after)
+        return start, (_start_minutes(depart_before) if depart_before is not None else start + 1440)
+
+    def earliest_arrival(self, origin: str, destination: str, depart_after, depart_before=None,
+                         max_connections: int = 2, min_layover: Optional[int] = None) -> Tuple[Optional[Itinerary], SearchMetrics]:
+        lay = self.min_layover if min_layover is None else min_layover
+        t0 = time.perf_counter()
+        start, end = self._window(depart_after, depart_before)
+        best, parent, comps = self._scan(origin, destination, start, end, max_connections, lay)
+        choice = None
+        for k in range(1, max_connections + 2):
+            a = best[k].get(destination)
+            if a is not None and (choice is None or a < choice[1]):
+                choice = (k, a)
+        it = Itinerary(self._unwind(parent, choice[0], destination)) if choice else None
+        dt = (time.perf_counter() - t0) * 1000
+        return it, SearchMetrics("csa(earliest)", dt, comps, len(self), details=f"{origin}→{destination}")
+
+    def fewest_legs(self, origin: str, destination: str, depart_after, depart_before=None,
+                    max_connections: int = 2, min_layover: Optional[int] = None) -> Tuple[Optional[Itinerary], SearchMetrics]:
+        lay = self.min_layover if min_layover is None else min_layover
+        t0 = time.perf_counter()
+        start, end = self._window(depart_after, depart_before)
+        # sem corte na melhor chegada: um direto que parte depois de uma conexão ainda tem menos trechos
+        best, parent, comps = self._scan(origin, destination, start, end, max_connections, lay,
+                                         stop_at_target=False)
+        it = None
+        for k in range(1, max_connections + 2):
+            if destination in best[k]:
+                it = Itinerary(self._unwind(parent, k, destination))
+                break
+        dt = (time.perf_counter() - t0) * 1000
+        return it, SearchMetrics("csa(fewest-legs)", dt, comps, len(self), details=f"{origin}→{destination}")
+
+    # ---------- Dijkstra dependente do tempo (mais barato) ----------
+    def cheapest(self, origin: str, destination: str, depart_after, depart_before=None,
+                 max_connections: int = 2, min_layover: Optional[int] = None,
+                 limit: int = 1) -> Tuple[List[Itinerary], SearchMetrics]:
+        """
+        Até `limit` itinerários mais baratos com partida em [depart_after, depart_before)
+        (padrão: 1 dia). Um estado (aeroporto, trechos, chegada) é descartado se outro já
+        finalizado no mesmo aeroporto chegou antes com no máximo os mesmos trechos.
+        """
+        lay = self.min_layover if min_layover is None else min_layover
+        t0 = time.perf_counter()
+        start = _start_minutes(depart_after)
+        end = _start_minutes(depart_before) if depart_before is not None else start + 1440
+        max_legs = max_connections + 1
+        comps = 0
+        out: List[Itinerary] = []
+        settled: Dict[str, List[Tuple[int, int]]] = {}
+        heap: List[tuple] = []
+        seq = 0
+
+        idx = self.departures.get(origin, [])
+        times = self._dep_times.get(origin, [])
+        for j in range(bisect_left(times, start), len(times)):
+            c = idx[j]
+            if self.dep[c] >= end:
+                break
+            comps += 1
+            heapq.heappush(heap, (self.price[c], seq, c, 1, None)); seq += 1
+
+        while heap and len(out) < limit:
+            cost, _, c, k, prev = heapq.heappop(heap)
+            here = self.dst[c]; t = self.arr[c]
+            node = (c, prev)
+            if here == destination:
+                legs = []
+                while node is not None:
+                    legs.append(self.flights[node[0]])
+                    node = node[1]
+                legs.reverse()
+                out.append(Itinerary(legs))
+                continue
+            marks = settled.setdefault(here, [])
+            if any(k2 <= k and t2 <= t for k2, t2 in marks):
+                continue
+            marks.append((k, t))
+            if k >= max_legs:
+                continue
+            idx = self.departures.get(here, [])
+            times = self._dep_times.get(here, [])
+            for j in range(bisect_left(times, t + lay), len(times)):
+                c2 = idx[j]
+                if self.dep[c2] - t > self.max_layover:
+                    break
+                comps += 1
+                x = self.dst[c2]
+                if x == origin:
+                    continue
+                heapq.heappush(heap, (cost + self.price[c2], seq, c2, k + 1, node)); seq += 1
+
+        dt = (time.perf_counter() - t0) * 1000
+        return out, SearchMetrics("dijkstra(cheapest)", dt, comps, len(self), details=f"{origin}→{destination}")
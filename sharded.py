@@ -0,0 +1,235 @@
+# sharded.py
+# Dataset particionado em processos (um shard por núcleo) com consultas scatter/gather:
+# cada shard filtra/ordena/busca a sua parte em paralelo e devolve só os índices locais dos voos;
+# o processo principal junta as partes com k-way merge (heapq.merge) e soma contagens e métricas.
+# Consulta sem `limit` devolve só a primeira página (PAGE_SIZE) — `total` continua sendo a contagem
+# completa; a lista inteira, com todos os índices voltando e o merge serial, é opt-in (full=True).
+# Só a CLI usa os shards; o app roda run_query no próprio processo (QueryExecutor).
+# Uso: python query_engine.py --demo 2000000 --queries consultas.jsonl --shards 8
+import os
+import time
+import heapq
+import zlib
+import threading
+import multiprocessing as mp
+from array import array
+from dataclasses import replace
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from models import Flight
+from algorithms import SortMetrics, SearchMetrics
+from query_engine import Query, QueryResult, run_query, top_flights, filter_flights, sort_key_for
+from tracing import TRACER
+
+PAGE_SIZE = 1000       # voos devolvidos por consulta sem limit (a menos que full=True)
+
+# ---------------- partição ----------------
+def _shard_of(key: str, n: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % n      # estável entre processos (hash() de str não é)
+
+def partition(flights: Sequence[Flight], n: int, by: str = "route") -> List[List[Flight]]:
+    """by="route": mesma rota no mesmo shard; by="date": mesmo dia no mesmo shard."""
+    if by not in ("route", "date"):
+        raise ValueError("by deve ser 'route' ou 'date'")
+    shards: List[List[Flight]] = [[] for _ in range(n)]
+    cache = {}
+    for f in flights:
+        k = (f.origin, f.destination) if by == "route" else f.date
+        i = cache.get(k)
+        if i is None:
+            i = cache[k] = _shard_of("-".join(k) if by == "route" else k, n)
+        shards[i].append(f)
+    return shards
+
+# ---------------- processo do shard ----------------
+def _shard_worker(conn):
+    shard: List[Flight] = []
+    pos = {}
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        op = msg[0]
+        if op == "stop":
+            return
+        try:
+            if op == "load":
+                shard = [Flight(*t) for t in msg[1]]
+                pos = {id(f): i for i, f in enumerate(shard)}
+                conn.send(("ok", len(shard)))
+            elif op == "query":
+                q = msg[1]
+                res = run_query(shard, q)
+                conn.send(("ok", (array("i", (pos[id(f)] for f in res.flights)), res.total,
+                                  res.sort_metrics, res.search_metrics, res.elapsed_ms)))
+            elif op == "topk":
+                q, k = msg[1], msg[2]
+                res = top_flights(shard, q, k)
+                conn.send(("ok", (array("i", (pos[id(f)] for f in res.flights)), res.total,
+                                  res.sort_metrics, None, res.elapsed_ms)))
+            elif op == "count":
+                conn.send(("ok", len(filter_flights(shard, msg[1]))))
+            else:
+                conn.send(("error", f"operação desconhecida: {op}"))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+# ---------------- métricas combinadas ----------------
+def _sum_or_none(vals) -> Optional[int]:
+    vals = list(vals)
+    return None if any(v is None for v in vals) else sum(vals)
+
+def combine_sort_metrics(parts: List[SortMetrics], wall_ms: float, merge_ms: float) -> SortMetrics:
+    """Comparações/movimentos somados; tempo = parede do scatter/gather (o que o usuário espera)."""
+    algo = parts[0].algorithm if parts else "-"
+    return SortMetrics(f"{algo} ×{len(parts)} shards + k-way merge ({merge_ms:.1f} ms)", wall_ms,
+                       _sum_or_none(p.comparisons for p in parts),
+                       _sum_or_none(p.swaps_or_moves for p in parts),
+                       sum(p.n for p in parts))
+
+def combine_search_metrics(parts: List[SearchMetrics], wall_ms: float) -> Optional[SearchMetrics]:
+    if not parts:
+        return None
+    return SearchMetrics(f"{parts[0].algorithm} ×{len(parts)} shards", wall_ms,
+                         sum(p.comparisons for p in parts), sum(p.n for p in parts), parts[0].details)
+
+# ---------------- gerenciador ----------------
+class ShardManager:
+    """
+    Mantém `shards` processos, cada um com a sua parte do dataset. Interface igual à do QueryEngine
+    (run/run_many), mais top_k e count. As chamadas são serializadas (um scatter/gather por vez);
+    o paralelismo está dentro de cada consulta.
+    """
+    def __init__(self, flights: Sequence[Flight] = (), shards: Optional[int] = None, by: str = "route"):
+        self.n = max(1, shards or os.cpu_count() or 1)
+        self.by = by
+        self._lock = threading.Lock()
+        ctx = mp.get_context("spawn")        # sem fork: o processo pai pode ter Tk e threads ativos
+        self._conns = []
+        self._procs = []
+        for i in range(self.n):
+            parent, child = ctx.Pipe()
+            p = ctx.Process(target=_shard_worker, args=(child,), name=f"shard-{i}", daemon=True)
+            p.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(p)
+        self.shards: List[List[Flight]] = [[] for _ in range(self.n)]
+        self.load_ms = 0.0
+        if flights:
+            self.load(flights)
+
+    # ---------- comunicação ----------
+    def _gather(self) -> list:
+        out, err = [], None
+        for c in self._conns:
+            status, payload = c.recv()
+            if status == "error" and err is None:
+                err = payload
+            out.append(payload)
+        if err is not None:
+            raise RuntimeError(f"Falha em shard: {err}")
+        return out
+
+    def _scatter(self, msgs: List[tuple]) -> list:
+        with self._lock:
+            for c, m in zip(self._conns, msgs):
+                c.send(m)
+            return self._gather()
+
+    def _broadcast(self, *msg) -> list:
+        return self._scatter([msg] * self.n)
+
+    # ---------- dados ----------
+    def load(self, flights: Sequence[Flight]):
+        t0 = time.perf_counter()
+        with TRACER.span("shards.load", rows_in=len(flights), shards=self.n, by=self.by):
+            self.shards = partition(flights, self.n, self.by)
+            # tuplas serializam bem mais rápido que instâncias de dataclass
+            self._scatter([("load", [(f.flight_id, f.airline, f.origin, f.destination, f.date,
+                                      f.depart_time, f.arrive_time, f.price) for f in s])
+                           for s in self.shards])
+        self.load_ms = (time.perf_counter() - t0) * 1000
+
+    def __len__(self):
+        return sum(len(s) for s in self.shards)
+
+    # ---------- consultas ----------
+    @staticmethod
+    def _order(q: Query) -> Tuple[Callable[[Flight], object], bool]:
+        """Ordem da saída de run_query: busca binária reordena por preço; senão vale a chave pedida."""
+        if q.search_algo == "binary" and q.search_value is not None:
+            return sort_key_for("price"), False
+        return sort_key_for(q.sort_key), q.descending
+
+    def _merge(self, parts, key, reverse: bool, limit: Optional[int]) -> Tuple[List[Flight], float]:
+        t0 = time.perf_counter()
+        with TRACER.span("shards.merge", rows_in=sum(len(p[0]) for p in parts)) as sp:
+            runs = [[shard[i] for i in idx] for shard, (idx, *_) in zip(self.shards, parts)]
+            merged = heapq.merge(*runs, key=key, reverse=reverse)
+            if limit is not None:
+                out = [f for _, f in zip(range(max(0, limit)), merged)]
+            else:
+                out = list(merged)
+            sp.rows_out = len(out)
+        return out, (time.perf_counter() - t0) * 1000
+
+    def run(self, q, token=None, full: bool = False) -> QueryResult:
+        """
+        Sem `q.limit`, cada shard devolve no máximo PAGE_SIZE índices e o resultado é a primeira
+        página (`total` é a contagem completa). full=True materializa o resultado inteiro.
+        """
+        if isinstance(q, dict):
+            q = Query.from_dict(q)
+        limit = q.limit if q.limit is not None or full else PAGE_SIZE
+        t0 = time.perf_counter()
+        with TRACER.span("shards.query", rows_in=len(self), shards=self.n) as sp:
+            if token is not None:
+                token.check()
+            # cada parte já vem ordenada: as `limit` primeiras de cada shard bastam para o merge
+            parts = self._broadcast("query", q if limit == q.limit else replace(q, limit=limit))
+            if token is not None:
+                token.check()
+            key, reverse = self._order(q)
+            flights, merge_ms = self._merge(parts, key, reverse, limit)
+            wall = (time.perf_counter() - t0) * 1000
+            sm = combine_sort_metrics([p[2] for p in parts], wall, merge_ms)
+            met = combine_search_metrics([p[3] for p in parts if p[3] is not None], wall)
+            sp.rows_out = len(flights)
+        return QueryResult(flights, sum(p[1] for p in parts), sm, met, wall, q)
+
+    def run_many(self, queries, full: bool = False):
+        for q in queries:
+            yield self.run(q, full=full)
+
+    def top_k(self, q: Query, k: int) -> QueryResult:
+        t0 = time.perf_counter()
+        parts = self._broadcast("topk", q, k)
+        flights, merge_ms = self._merge(parts, sort_key_for(q.sort_key), q.descending, k)
+        wall = (time.perf_counter() - t0) * 1000
+        sm = combine_sort_metrics([p[2] for p in parts], wall, merge_ms)
+        return QueryResult(flights, sum(p[1] for p in parts), sm, None, wall, q)
+
+    def count(self, q: Query) -> int:
+        return sum(self._broadcast("count", q))
+
+    # ---------- ciclo de vida ----------
+    def close(self):
+        for c in self._conns:
+            try:
+                c.send(("stop",))
+                c.close()
+            except (OSError, BrokenPipeError):
+                pass
+        for p in self._procs:
+            p.join(timeout=2)
+            if p.is_alive():
+                p.terminate()
+        self._conns, self._procs = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,203 @@
+# sketches.py
+# Sketches de quantis (KLL) e histogramas de buckets fixos, ambos mescláveis,
+# para mostrar a distribuição de preços sem ordenar o dataset inteiro.
+from typing import List, Dict, Optional, Tuple, Iterable, Sequence
+from bisect import bisect_left, bisect_right
+import math
+import random
+
+from models import Flight
+
+class KLLSketch:
+    """
+    Sketch KLL (Karnin–Lang–Liberty): níveis com capacidade decrescente geometricamente;
+    ao encher, um nível é ordenado e metade dos itens sobe ao próximo nível com peso dobrado.
+    Memória ~O(k), erro de rank ~O(1/k). Dois sketches se combinam com `merge` sem reler os dados.
+    """
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.levels: List[List[float]] = [[]]
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = random.Random(seed)
+        self._view: Optional[Tuple[List[float], List[int]]] = None   # (valores, pesos acumulados)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                lvl = sorted(self.levels[h])
+                rest = [lvl.pop()] if len(lvl) % 2 else []
+                off = self._rng.randint(0, 1)
+                self.levels[h + 1].extend(lvl[off::2])
+                self.levels[h] = rest
+            h += 1
+
+    def update(self, x: float):
+        self.levels[0].append(x)
+        self.n += 1
+        if x < self.min: self.min = x
+        if x > self.max: self.max = x
+        self._view = None
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def update_many(self, xs: Iterable[float]):
+        for x in xs:
+            self.update(x)
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, lvl in enumerate(other.levels):
+            self.levels[h].extend(lvl)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._view = None
+        self._compress()
+        return self
+
+    def _sorted_view(self) -> Tuple[List[float], List[int]]:
+        # Materializado uma vez após cada atualização; consultas seguintes são O(log k).
+        if self._view is None:
+            items = sorted((x, 1 << h) for h, lvl in enumerate(self.levels) for x in lvl)
+            vals, cum, acc = [], [], 0
+            for x, w in items:
+                acc += w
+                vals.append(x); cum.append(acc)
+            self._view = (vals, cum)
+        return self._view
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        if q <= 0: return self.min
+        if q >= 1: return self.max
+        vals, cum = self._sorted_view()
+        i = bisect_left(cum, q * cum[-1])
+        return vals[min(i, len(vals) - 1)]
+
+    def quantiles(self, qs: Sequence[float] = (0.5, 0.9, 0.99)) -> List[Optional[float]]:
+        return [self.quantile(q) for q in qs]
+
+    def fraction_under(self, x: float) -> float:
+        """Fração estimada de valores <= x."""
+        if self.n == 0:
+            return 0.0
+        vals, cum = self._sorted_view()
+        i = bisect_right(vals, x)
+        return (cum[i - 1] / cum[-1]) if i else 0.0
+
+    def __len__(self):
+        return self.n
+
+class FixedHistogram:
+    """Histograma de buckets fixos em [lo, hi) com contadores de under/overflow. Mesclável se os limites forem iguais."""
+    def __init__(self, lo: float = 0.0, hi: float = 10000.0, buckets: int = 100):
+        self.lo, self.hi, self.nb = lo, hi, buckets
+        self.width = (hi - lo) / buckets
+        self.counts = [0] * buckets
+        self.under = 0
+        self.over = 0
+        self.n = 0
+        self._cum: Optional[List[int]] = None
+
+    def update(self, x: float):
+        self.n += 1
+        self._cum = None
+        if x < self.lo:
+            self.under += 1
+        elif x >= self.hi:
+            self.over += 1
+        else:
+            self.counts[int((x - self.lo) / self.width)] += 1
+
+    def merge(self, other: "FixedHistogram") -> "FixedHistogram":
+        if (self.lo, self.hi, self.nb) != (other.lo, other.hi, other.nb):
+            raise ValueError("Histogramas com limites diferentes não podem ser mesclados.")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.under += other.under
+        self.over += other.over
+        self.n += other.n
+        self._cum = None
+        return self
+
+    def _cumulative(self) -> List[int]:
+        if self._cum is None:
+            acc, cum = self.under, []
+            for c in self.counts:
+                acc += c
+                cum.append(acc)
+            self._cum = cum
+        return self._cum
+
+    def fraction_under(self, x: float) -> float:
+        """Fração de valores <= x, interpolando linearmente dentro do bucket."""
+        if self.n == 0:
+            return 0.0
+        if x < self.lo:
+            return 0.0
+        if x >= self.hi:
+            return (self.n - self.over) / self.n
+        b = int((x - self.lo) / self.width)
+        cum = self._cumulative()
+        before = cum[b - 1] if b else self.under
+        part = self.counts[b] * ((x - self.lo - b * self.width) / self.width)
+        return (before + part) / self.n
+
+    def buckets(self) -> List[Tuple[float, float, int]]:
+        return [(self.lo + i * self.width, self.lo + (i + 1) * self.width, c) for i, c in enumerate(self.counts)]
+
+class PriceStats:
+    """Sketch + histograma global e um sketch por rota, alimentados durante a ingestão."""
+    def __init__(self, k: int = 200, hist_lo: float = 0.0, hist_hi: float = 10000.0, hist_buckets: int = 100):
+        self.k = k
+        self.sketch = KLLSketch(k)
+        self.hist = FixedHistogram(hist_lo, hist_hi, hist_buckets)
+        self.by_route: Dict[Tuple[str, str], KLLSketch] = {}
+
+    def add(self, f: Flight):
+        p = f.price
+        self.sketch.update(p)
+        self.hist.update(p)
+        r = self.by_route.get((f.origin, f.destination))
+        if r is None:
+            r = self.by_route[(f.origin, f.destination)] = KLLSketch(self.k)
+        r.update(p)
+
+    def add_many(self, flights: Iterable[Flight]):
+        for f in flights:
+            self.add(f)
+
+    def merge(self, other: "PriceStats") -> "PriceStats":
+        self.sketch.merge(other.sketch)
+        self.hist.merge(other.hist)
+        for route, sk in other.by_route.items():
+            mine = self.by_route.get(route)
+            if mine is None:
+                mine = self.by_route[route] = KLLSketch(self.k)
+            mine.merge(sk)
+        return self
+
+    def _pick(self, route: Optional[Tuple[str, str]]) -> Optional[KLLSketch]:
+        return self.sketch if route is None else self.by_route.get(route)
+
+    def quantiles(self, qs: Sequence[float] = (0.5, 0.9, 0.99), route: Optional[Tuple[str, str]] = None) -> List[Optional[float]]:
+        sk = self._pick(route)
+        return sk.quantiles(qs) if sk else [None] * len(qs)
+
+    def fraction_under(self, x: float, route: Optional[Tuple[str, str]] = None) -> float:
+        sk = self._pick(route)
+        return sk.fraction_under(x) if sk else 0.0
+
+    @property
+    def n(self) -> int:
+        return self.sketch.n
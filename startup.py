@@ -0,0 +1,100 @@
+# startup.py
+# Tempo de inicialização do app: ms por import e por fase, e import preguiçoso dos módulos
+# pesados (requests/providers, loader de CSV por URL…) que só carregam no primeiro uso.
+# Relatório: python main_fast.py --startup-report   (ou FLIGHTS_STARTUP_REPORT=1)
+import os
+import sys
+import time
+import builtins
+import importlib
+from contextlib import contextmanager
+from typing import List, Tuple
+
+class StartupTimer:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.imports: List[Tuple[str, float]] = []     # (módulo, ms) — imports de topo do bloco medido
+        self.lazy: List[Tuple[str, float]] = []        # (módulo, ms) — carregados sob demanda
+        self.phases: List[Tuple[str, float]] = []      # (fase, ms)
+        self.ready_ms: float = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return "--startup-report" in sys.argv or bool(os.environ.get("FLIGHTS_STARTUP_REPORT"))
+
+    @contextmanager
+    def imports_block(self):
+        """Mede cada `import` feito diretamente dentro do bloco (os aninhados entram no total do pai)."""
+        real = builtins.__import__
+        depth = [0]
+
+        def timed(name, globals=None, locals=None, fromlist=(), level=0):
+            if depth[0]:
+                return real(name, globals, locals, fromlist, level)
+            depth[0] += 1
+            t0 = time.perf_counter()
+            try:
+                return real(name, globals, locals, fromlist, level)
+            finally:
+                depth[0] -= 1
+                self.imports.append((name, (time.perf_counter() - t0) * 1000))
+
+        builtins.__import__ = timed
+        try:
+            with self.phase("imports"):
+                yield
+        finally:
+            builtins.__import__ = real
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - t0) * 1000))
+
+    def mark_ready(self):
+        """Chamado quando a janela já está desenhada e ociosa."""
+        if not self.ready_ms:
+            self.ready_ms = (time.perf_counter() - self.t0) * 1000
+
+    def report(self, top: int = 12) -> str:
+        lines = ["--- INICIALIZAÇÃO ---", f"janela pronta em {self.ready_ms:.1f} ms"]
+        lines += [f"  fase {name:<22} {ms:8.1f} ms" for name, ms in self.phases]
+        per_module: dict = {}
+        for name, ms in self.imports:          # "import tkinter" + "from tkinter import ttk" somam
+            per_module[name] = per_module.get(name, 0.0) + ms
+        slow = sorted(per_module.items(), key=lambda x: -x[1])[:top]
+        lines += [f"  import {name:<20} {ms:8.1f} ms" for name, ms in slow if ms >= 0.05]
+        lines += [f"  sob demanda {name:<15} {ms:8.1f} ms" for name, ms in self.lazy]
+        lines.append("---------------------")
+        return "\n".join(lines)
+
+TIMER = StartupTimer()
+
+class LazyModule:
+    """Importa o módulo no primeiro acesso a um atributo (e registra o tempo em TIMER.lazy)."""
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_mod"] = None
+
+    def _load(self):
+        mod = self.__dict__["_mod"]
+        if mod is None:
+            name = self.__dict__["_name"]
+            t0 = time.perf_counter()
+            mod = importlib.import_module(name)
+            TIMER.lazy.append((name, (time.perf_counter() - t0) * 1000))
+            self.__dict__["_mod"] = mod
+        return mod
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "carregado" if self.__dict__["_mod"] is not None else "pendente"
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
@@ -0,0 +1,121 @@
+# temporal.py
+# Parsing de datas/horas compartilhado pelos loaders, com caches limitados (lru_cache).
+# Em dumps de tarifas milhões de linhas repetem poucas centenas de datas/horários distintos,
+# então cada string é convertida uma única vez.
+from functools import lru_cache
+from datetime import datetime
+from typing import Optional, Tuple, Callable, Iterable
+
+DATE_CACHE = 8192
+TIME_CACHE = 4096
+
+# ---------------- ISO (APIs) ----------------
+@lru_cache(maxsize=DATE_CACHE)
+def parse_iso(iso_str: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """'2025-09-01T10:30:00Z' / com offset / só 'YYYY-MM-DD' → ('YYYY-MM-DD', 'HH:MM')."""
+    if not iso_str:
+        return None, None
+    s = iso_str.replace("Z", "+00:00")
+    try:
+        dt = datetime.fromisoformat(s)
+        return dt.date().isoformat(), dt.strftime("%H:%M")
+    except Exception:
+        if len(iso_str) == 10:
+            return iso_str, "00:00"
+        return None, None
+
+# ---------------- Datas livres (CSV) ----------------
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m", "%Y", "%d-%m-%Y")
+
+def _fmt_out(dt: datetime, fmt: str) -> str:
+    if fmt == "%Y-%m":   return dt.strftime("%Y-%m-01")
+    if fmt == "%Y":      return dt.strftime("%Y-01-01")
+    return dt.strftime("%Y-%m-%d")
+
+@lru_cache(maxsize=DATE_CACHE)
+def norm_date(x: Optional[str]) -> str:
+    """Aceita YYYY-MM-DD, YYYY-MM, YYYY, dd-mm-YYYY (com '-' ou '/'); senão '1970-01-01'."""
+    if not x: return "1970-01-01"
+    s = str(x).strip().replace("/", "-")
+    for fmt in DATE_FORMATS:
+        try:
+            return _fmt_out(datetime.strptime(s, fmt), fmt)
+        except ValueError:
+            pass
+    return "1970-01-01"
+
+def detect_date_format(samples: Iterable[Optional[str]]) -> Optional[str]:
+    """Primeiro formato que aceita todas as amostras não vazias (ou None se nenhum)."""
+    vals = [str(v).strip().replace("/", "-") for v in samples if v]
+    if not vals:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            for v in vals:
+                datetime.strptime(v, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+@lru_cache(maxsize=None)           # um conversor (e um cache) por formato, compartilhado entre chamadas
+def date_parser(fmt: Optional[str]) -> Callable[[Optional[str]], str]:
+    """
+    Conversor especializado para uma coluna cujo formato já foi detectado:
+    tenta só `fmt` (memoizado) e cai em norm_date para linhas fora do padrão.
+    Chamadas com o mesmo `fmt` devolvem o mesmo conversor, já com o cache aquecido.
+    """
+    if fmt is None:
+        return norm_date
+
+    @lru_cache(maxsize=DATE_CACHE)
+    def parse(x: Optional[str]) -> str:
+        if not x: return "1970-01-01"
+        s = str(x).strip().replace("/", "-")
+        try:
+            return _fmt_out(datetime.strptime(s, fmt), fmt)
+        except ValueError:
+            return norm_date(x)
+    return parse
+
+# ---------------- Horas ----------------
+@lru_cache(maxsize=TIME_CACHE)
+def norm_time(x: Optional[str]) -> str:
+    """Aceita '8', '8:3', '08:30', '0830' → 'HH:MM'; vazio/ inválido → '08:00'."""
+    if not x: return "08:00"
+    s = str(x).strip()
+    if s.isdigit() and len(s) in (3,4):
+        s = s.zfill(4);  return f"{s[:2]}:{s[2:]}"
+    if ":" in s:
+        hh, mm = s.split(":")[:2]
+        hh = hh.zfill(2); mm = mm.zfill(2)
+        return f"{hh}:{mm}"
+    if s.isdigit():
+        return f"{int(s)%24:02d}:00"
+    return "08:00"
+
+@lru_cache(maxsize=TIME_CACHE)
+def _minute_of_day(hhmm: str) -> int:
+    hh, mm = hhmm.split(":")[:2]
+    return int(hh) * 60 + int(mm)
+
+_HHMM = [f"{t // 60:02d}:{t % 60:02d}" for t in range(1440)]   # minuto do dia → 'HH:MM'
+
+def add_minutes(hhmm: str, minutes: int) -> str:
+    """Horário de chegada 'HH:MM' após `minutes` (dá a volta na meia-noite)."""
+    return _HHMM[(_minute_of_day(hhmm) + int(minutes)) % 1440]
+
+@lru_cache(maxsize=TIME_CACHE * 4)
+def duration_minutes(depart: str, arrive: str) -> int:
+    """Duração em minutos entre dois 'HH:MM'; chegada antes da partida = dia seguinte."""
+    d = _minute_of_day(arrive) - _minute_of_day(depart)
+    return d + 1440 if d < 0 else d
+
+@lru_cache(maxsize=DATE_CACHE * 4)
+def to_datetime(date_str: str, hhmm: str) -> datetime:
+    return datetime.fromisoformat(f"{date_str} {hhmm}:00")
+
+def cache_info() -> dict:
+    """Estatísticas dos caches (hits/misses/tamanho), útil para medir o ganho."""
+    return {f.__name__: f.cache_info()._asdict() for f in
+            (parse_iso, norm_date, norm_time, _minute_of_day, duration_minutes, to_datetime)}
@@ -0,0 +1,5 @@
+# Os módulos ficam na raiz do repositório (sem pacote): deixa-os importáveis pelos testes.
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
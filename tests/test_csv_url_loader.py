@@ -0,0 +1,99 @@
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import csv_url_loader as cul
+
+HEADER = "flight_id,airline,origin,destination,date,depart_time,arrive_time,price\n"
+MAPPING = {"flight_id": "flight_id", "airline": "airline", "origin": "origin", "destination": "destination",
+           "date": "date", "depart_time": "depart_time", "arrive_time": "arrive_time",
+           "duration_min": None, "price": "price"}
+
+def _rows(start, n):
+    return "".join(f"F{i},XX,GRU,LIS,2025-03-01,10:00,20:00,{100 + i}\n" for i in range(start, start + n))
+
+class _Server:
+    """Servidor local com ETag, If-None-Match (304) e Range (206) — o suficiente para o refresh."""
+    def __init__(self):
+        self.body = b""
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                body = server.body
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                server.requests.append(dict(self.headers))
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                rng = self.headers.get("Range")
+                if rng:
+                    start = int(rng.split("=")[1].rstrip("-"))
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.end_headers()
+                        return
+                    part = body[start:]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                else:
+                    part = body
+                    self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", formatdate(usegmt=True))
+                self.send_header("Content-Length", str(len(part)))
+                self.end_headers()
+                self.wfile.write(part)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/voos.csv"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    srv = _Server()
+    yield srv
+    srv.close()
+
+def test_refresh_full_304_append_and_changed_tail(server, tmp_path):
+    store = cul.UrlSourceStore(tmp_path / "url_sources.json")
+    server.body = (HEADER + _rows(0, 10)).encode()
+
+    res = cul.refresh_flights_from_url(server.url, store, mapping=MAPPING)
+    assert res.status == "full"
+    assert [f.flight_id for f in res.flights] == [f"F{i}" for i in range(10)]
+
+    res = cul.refresh_flights_from_url(server.url, store)
+    assert res.status == "not_modified" and res.flights == []
+
+    server.body += _rows(10, 5).encode()
+    res = cul.refresh_flights_from_url(server.url, store)
+    assert res.status == "appended"
+    assert [f.flight_id for f in res.flights] == [f"F{i}" for i in range(10, 15)]
+    assert server.requests[-1].get("Range")
+
+    # o trecho já lido mudou: a cauda não confere e a recarga volta a ser completa
+    server.body = (HEADER + _rows(100, 3) + _rows(200, 20)).encode()
+    res = cul.refresh_flights_from_url(server.url, store)
+    assert res.status == "full"
+    assert len(res.flights) == 23
+    assert not server.requests[-1].get("Range")
+
+def test_refresh_without_incremental_always_reloads(server, tmp_path):
+    store = cul.UrlSourceStore(tmp_path / "url_sources.json")
+    server.body = (HEADER + _rows(0, 4)).encode()
+    cul.refresh_flights_from_url(server.url, store, mapping=MAPPING)
+    res = cul.refresh_flights_from_url(server.url, store, incremental=False)
+    assert res.status == "full" and len(res.flights) == 4
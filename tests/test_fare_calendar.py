@@ -0,0 +1,22 @@
+from dataclasses import replace
+
+from fare_calendar import FareCalendar
+from models import Flight
+
+def _f(fid, price, dep="10:00"):
+    return Flight(fid, "XX", "GRU", "LIS", "2025-03-01", dep, "20:00", price)
+
+def test_remove_equal_copy_and_changed_price():
+    a, b = _f("A", 500.0), _f("B", 300.0, dep="12:00")
+    cal = FareCalendar([a, b])
+    assert cal.remove(replace(a))                # objeto igual, não o mesmo
+    b.price = 900.0                              # preço mudou depois da inserção
+    assert cal.remove(b)
+    assert len(cal) == 0 and cal.day("GRU", "LIS", "2025-03-01") is None
+
+def test_min_avg_count_after_remove():
+    a, b, c = _f("A", 500.0), _f("B", 300.0, dep="12:00"), _f("C", 700.0, dep="14:00")
+    cal = FareCalendar([a, b, c])
+    cal.remove(_f("B", 300.0, dep="12:00"))
+    st = cal.day("GRU", "LIS", "2025-03-01")
+    assert (st.count, st.min_price, st.avg_price, st.cheapest) == (2, 500.0, 600.0, a)
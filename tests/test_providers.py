@@ -0,0 +1,82 @@
+import pytest
+
+from fake_tp_server import FakeTravelpayouts, FakeTravelpayoutsServer
+from models import Flight
+from response_cache import ResponseCache
+from providers import HttpSession, SingleFlight, TravelpayoutsClient, market_requests
+
+TOKEN = "tok-123"
+AIRPORTS = ["GRU", "GIG", "LIS"]
+
+def _flights(per_route=5):
+    out = []
+    for o in AIRPORTS:
+        for d in AIRPORTS:
+            if o != d:
+                out += [Flight(f"{o}{d}{i}", "XX", o, d, f"2025-03-{i % 28 + 1:02d}", "10:00", "12:00", 100.0 + i)
+                        for i in range(per_route)]
+    return out
+
+@pytest.fixture
+def make_client():
+    servers = []
+
+    def make(state, max_retries=0, cache=None):
+        srv = FakeTravelpayoutsServer(state).start()      # porta efêmera
+        servers.append(srv)
+        session = HttpSession(max_retries=max_retries, backoff_max=2.0, timeout=5)
+        return TravelpayoutsClient(TOKEN, base_url=srv.base_url, session=session, cache=cache,
+                                   single_flight=SingleFlight())
+    yield make
+    for srv in servers:
+        srv.stop()
+
+def test_batch_fetch_reports_each_failure_and_keeps_successes(make_client):
+    state = FakeTravelpayouts(_flights(), error_rate=0.5, seed=3)
+    client = make_client(state)
+    reqs = market_requests(AIRPORTS, ["2025-03"])
+    results = list(client.batch_fetch(reqs, max_workers=4, rate_per_sec=1000, burst=100))
+
+    assert sorted((r.request.origin, r.request.destination) for r in results) == \
+        sorted((r.origin, r.destination) for r in reqs)
+    failed = [r for r in results if not r.ok]
+    ok = [r for r in results if r.ok]
+    assert len(failed) == state.errors and 0 < len(failed) < len(reqs)
+    for r in failed:
+        assert r.flights == [] and "500" in r.error and TOKEN not in r.error
+    for r in ok:
+        route = state.by_route[(r.request.origin, r.request.destination)]
+        assert sorted(f.price for f in r.flights) == sorted(f.price for f in route)
+
+def test_429_is_retried(make_client):
+    state = FakeTravelpayouts(_flights(), max_rps=2, retry_after=0.3)
+    client = make_client(state, max_retries=6)
+    got = [client.latest("GRU", "LIS", beginning_of_period="2025-03-01") for _ in range(3)]
+    assert all(len(fl) == 5 for fl in got)
+    assert state.throttled >= 1 and client.http.retries >= state.throttled
+    assert client.http.failures == 0
+
+def test_iter_latest_honours_max_pages_and_max_results(make_client):
+    state = FakeTravelpayouts(_flights(per_route=50))
+    client = make_client(state)
+
+    fl = list(client.iter_latest("GRU", "LIS", beginning_of_period="2025-03-01", page_size=10, max_pages=2))
+    assert len(fl) == 20 and state.served == 2
+
+    served = state.served
+    fl = list(client.iter_latest("GIG", "LIS", beginning_of_period="2025-03-01", page_size=10, max_results=15))
+    assert len(fl) == 15
+    assert state.served - served <= 3          # no máximo uma página de prefetch além das duas lidas
+
+    served = state.served
+    fl = list(client.iter_latest("LIS", "GRU", beginning_of_period="2025-03-01", page_size=20))
+    assert len(fl) == 50 and state.served - served == 3      # para na página incompleta
+
+def test_cache_is_keyed_by_base_url(make_client, tmp_path):
+    cache = ResponseCache(tmp_path / "cache")
+    a = make_client(FakeTravelpayouts(_flights(per_route=3)), cache=cache)
+    b = make_client(FakeTravelpayouts(_flights(per_route=7)), cache=cache)
+    assert len(a.latest("GRU", "LIS", beginning_of_period="2025-03-01")) == 3
+    assert len(b.latest("GRU", "LIS", beginning_of_period="2025-03-01")) == 7      # outro servidor, outra chave
+    assert len(a.latest("GRU", "LIS", beginning_of_period="2025-03-01")) == 3
+    assert cache.metrics()["misses"] == 2 and cache.metrics()["hits"] == 1
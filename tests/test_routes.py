@@ -0,0 +1,27 @@
+from models import Flight
+from routes import RouteGraph
+
+def _f(fid, o, d, day, dep, arr, price=100.0):
+    return Flight(fid, "XX", o, d, day, dep, arr, price)
+
+def _graph():
+    return RouteGraph([
+        _f("A", "GRU", "LIS", "2025-03-01", "06:00", "07:00"),
+        _f("B", "LIS", "CDG", "2025-03-01", "08:30", "10:00"),
+        _f("C", "GRU", "CDG", "2025-03-01", "11:00", "13:00"),
+    ])
+
+def test_fewest_legs_prefers_later_direct_flight():
+    it, _ = _graph().fewest_legs("GRU", "CDG", "2025-03-01")
+    assert [f.flight_id for f in it.legs] == ["C"]
+
+def test_earliest_arrival_takes_connection():
+    it, _ = _graph().earliest_arrival("GRU", "CDG", "2025-03-01")
+    assert [f.flight_id for f in it.legs] == ["A", "B"]
+
+def test_scan_stops_at_horizon_for_unreachable_destination():
+    flights = [_f(f"X{i}", "GRU", "LIS", f"2025-03-{1 + i // 10:02d}", "10:00", "11:00") for i in range(300)]
+    g = RouteGraph(flights)
+    it, met = g.earliest_arrival("GRU", "NRT", "2025-03-01")
+    assert it is None
+    assert met.comparisons < len(g)
@@ -0,0 +1,90 @@
+# tp_loadtest.py
+# Mede vazão, latência p50/p99 e retries do caminho de I/O (TravelpayoutsClient + HttpSession)
+# contra o servidor falso (sobe um em processo se --url não for informado).
+# Uso: python tp_loadtest.py --months 2025-03 2025-04 --workers 16 --latency 10 40 --error-rate 0.05
+import time
+import argparse
+from typing import List, Optional
+
+import data_loader as dl
+from providers import TravelpayoutsClient, HttpSession, SingleFlight, market_requests
+from fake_tp_server import FakeTravelpayouts, FakeTravelpayoutsServer
+
+def _pct(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+def run_load(base_url: str, airports: List[str], months: List[str], endpoint: str = "latest",
+             workers: int = 8, rate: float = 0.0, max_retries: int = 3, backoff_base: float = 0.05,
+             limit: int = 100) -> dict:
+    session = HttpSession(pool_maxsize=max(workers, 10), max_retries=max_retries, backoff_base=backoff_base)
+    # sem cache e com SingleFlight próprio: cada requisição vai de fato ao servidor
+    cli = TravelpayoutsClient(token="loadtest", base_url=base_url, session=session, single_flight=SingleFlight())
+    reqs = market_requests(airports, months, endpoint=endpoint, limit=limit)
+    lat: List[float] = []
+    flights = failed = 0
+    t0 = time.perf_counter()
+    for res in cli.batch_fetch(reqs, max_workers=workers, rate_per_sec=rate, burst=workers):
+        lat.append(res.elapsed_ms)
+        if res.ok:
+            flights += len(res.flights)
+        else:
+            failed += 1
+    wall = time.perf_counter() - t0
+    lat.sort()
+    hs = session.stats()
+    session.close()
+    return {
+        "requests": len(reqs),
+        "failed": failed,
+        "flights": flights,
+        "wall_s": wall,
+        "throughput_rps": len(reqs) / wall if wall else 0.0,
+        "p50_ms": _pct(lat, 0.5),
+        "p99_ms": _pct(lat, 0.99),
+        "http_requests": hs["requests"],
+        "retries": hs["retries"],
+        "new_connections": hs["new_connections"],
+    }
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Load test do cliente Travelpayouts contra o servidor falso.")
+    ap.add_argument("--url", default=None, help="servidor já em execução (senão sobe um local)")
+    ap.add_argument("--endpoint", choices=["latest", "prices_for_dates"], default="latest")
+    ap.add_argument("--airports", nargs="+", default=dl.AIRPORTS)
+    ap.add_argument("--months", nargs="+", default=[time.strftime("%Y-%m")])
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=0.0, help="limite do cliente em req/s (0 = sem limite)")
+    ap.add_argument("--max-retries", type=int, default=3)
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--latency", type=float, nargs="+", default=[5.0, 20.0])
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rps", type=float, default=None)
+    args = ap.parse_args(argv)
+
+    srv = None
+    url = args.url
+    if url is None:
+        start = f"{args.months[0]}-01" if len(args.months[0]) == 7 else args.months[0]
+        flights = dl.generate_synthetic(n=args.n, start_date=start, days=31 * len(args.months))
+        state = FakeTravelpayouts(flights, (args.latency[0], args.latency[-1]), args.error_rate,
+                                  args.rps, retry_after=0.05)
+        srv = FakeTravelpayoutsServer(state).start()
+        url = srv.base_url
+    try:
+        rep = run_load(url, args.airports, args.months, args.endpoint, args.workers, args.rate, args.max_retries)
+    finally:
+        if srv is not None:
+            srv.stop()
+
+    print("\n--- LOAD TEST TRAVELPAYOUTS ---")
+    print(f"requisições={rep['requests']} falhas={rep['failed']} voos={rep['flights']}")
+    print(f"tempo={rep['wall_s']:.2f}s vazão={rep['throughput_rps']:.1f} req/s")
+    print(f"latência p50={rep['p50_ms']:.1f} ms p99={rep['p99_ms']:.1f} ms")
+    print(f"HTTP={rep['http_requests']} retries={rep['retries']} conexões novas={rep['new_connections']}")
+    print("-------------------------------\n")
+    return rep
+
+if __name__ == "__main__":
+    main()
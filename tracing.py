@@ -0,0 +1,227 @@
+# tracing.py
+# Spans aninhados para o pipeline inteiro (ingestão, filtro, ordenação, busca, renderização):
+# tempo de parede, linhas entrada/saída e pico de memória (tracemalloc) por etapa.
+# Exporta em JSON (árvore) ou no formato Chrome trace (chrome://tracing, Perfetto).
+#
+#   with TRACER.span("filter", rows_in=len(data)) as sp:
+#       out = ...
+#       sp.rows_out = len(out)
+#
+# Spans no mesmo thread se aninham sozinhos; entre threads, passe `parent=` explicitamente.
+import json
+import time
+import itertools
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+_ids = itertools.count(1)
+
+class Span:
+    __slots__ = ("id", "name", "parent", "children", "start", "end", "thread", "rows_in", "rows_out",
+                 "attrs", "mem_start", "mem_peak", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], rows_in: Optional[int], attrs: Dict[str, Any]):
+        self.id = next(_ids)
+        self.name = name
+        self.parent = parent
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread = threading.current_thread().name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.attrs = attrs
+        self.mem_start: Optional[int] = None     # bytes rastreados ao abrir
+        self.mem_peak: Optional[int] = None      # pico absoluto visto durante o span
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    @property
+    def mem_peak_kb(self) -> Optional[float]:
+        """Pico acima do que já estava alocado na abertura (KB)."""
+        if self.mem_start is None or self.mem_peak is None:
+            return None
+        return max(0, self.mem_peak - self.mem_start) / 1024
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, epoch: float) -> dict:
+        d = {"name": self.name, "start_ms": round((self.start - epoch) * 1000, 3),
+             "duration_ms": round(self.duration_ms, 3), "thread": self.thread}
+        if self.rows_in is not None: d["rows_in"] = self.rows_in
+        if self.rows_out is not None: d["rows_out"] = self.rows_out
+        if self.mem_peak_kb is not None: d["mem_peak_kb"] = round(self.mem_peak_kb, 1)
+        if self.attrs: d["attrs"] = dict(self.attrs)
+        if self.error: d["error"] = self.error
+        if self.children: d["children"] = [c.to_dict(epoch) for c in list(self.children)]
+        return d
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for c in list(self.children):
+            yield from c.walk()
+
+class _NoSpan:
+    """Devolvido com o tracer desligado: aceita as mesmas escritas e não guarda nada."""
+    __slots__ = ()
+    rows_out = None
+
+    def __setattr__(self, name, value):
+        pass
+
+    def set(self, **attrs):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+class Tracer:
+    """
+    Guarda as últimas `keep` árvores (spans raiz). Com `memory=True` liga o tracemalloc e mede o pico
+    por span (reset_peak é global ao processo: com spans concorrentes em vários threads o pico é aproximado).
+    """
+    def __init__(self, keep: int = 50, enabled: bool = True, memory: bool = False):
+        self.enabled = enabled
+        self.epoch = time.perf_counter()
+        self.roots: Deque[Span] = deque(maxlen=keep)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.memory = False
+        if memory:
+            self.set_memory(True)
+
+    # ---------- memória ----------
+    def set_memory(self, on: bool):
+        if on and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not on and self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memory = on
+
+    def _mem_open(self, sp: Span):
+        if self.memory and tracemalloc.is_tracing():
+            cur, peak = tracemalloc.get_traced_memory()
+            if sp.parent is not None and sp.parent.mem_peak is not None:
+                sp.parent.mem_peak = max(sp.parent.mem_peak, peak)   # preserva o pico do pai antes do reset
+            tracemalloc.reset_peak()
+            sp.mem_start = sp.mem_peak = cur
+
+    def _mem_close(self, sp: Span):
+        if sp.mem_start is not None and tracemalloc.is_tracing():
+            peak = max(sp.mem_peak or 0, tracemalloc.get_traced_memory()[1])
+            sp.mem_peak = peak
+            if sp.parent is not None and sp.parent.mem_peak is not None:
+                sp.parent.mem_peak = max(sp.parent.mem_peak, peak)
+
+    # ---------- spans ----------
+    def _stack(self) -> List[Span]:
+        st = getattr(self._local, "stack", None)
+        if st is None:
+            st = self._local.stack = []
+        return st
+
+    def current(self) -> Optional[Span]:
+        st = self._stack()
+        return st[-1] if st else None
+
+    def begin(self, name: str, parent: Optional[Span] = None, rows_in: Optional[int] = None, **attrs) -> Span:
+        """Abre um span sem contexto (ex.: consulta que começa num thread e termina em outro)."""
+        if parent is None:
+            parent = self.current()
+        sp = Span(name, parent, rows_in, {k: v for k, v in attrs.items() if v is not None})
+        if parent is not None:
+            with self._lock:
+                parent.children.append(sp)
+        else:
+            self.roots.append(sp)
+        self._mem_open(sp)
+        return sp
+
+    def finish(self, sp: Span):
+        if sp.end is None:
+            self._mem_close(sp)
+            sp.end = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, rows_in: Optional[int] = None, **attrs):
+        if not self.enabled:
+            yield _NO_SPAN
+            return
+        if isinstance(parent, _NoSpan):
+            parent = None
+        sp = self.begin(name, parent, rows_in, **attrs)
+        st = self._stack()
+        st.append(sp)
+        try:
+            yield sp
+        except BaseException as e:
+            sp.error = type(e).__name__
+            raise
+        finally:
+            st.pop()
+            self.finish(sp)
+
+    def start(self, name: str, rows_in: Optional[int] = None, **attrs):
+        """Como begin(), mas respeita `enabled` (devolve um span nulo quando desligado)."""
+        if not self.enabled:
+            return _NO_SPAN
+        return self.begin(name, None, rows_in, **attrs)
+
+    def end(self, sp):
+        if isinstance(sp, Span):
+            self.finish(sp)
+
+    def clear(self):
+        self.roots.clear()
+
+    # ---------- exportação ----------
+    def recent(self, n: Optional[int] = None) -> List[Span]:
+        roots = list(self.roots)
+        return roots if n is None else roots[-n:]
+
+    def to_json(self, n: Optional[int] = None) -> dict:
+        return {"traces": [sp.to_dict(self.epoch) for sp in self.recent(n)]}
+
+    def to_chrome_trace(self, n: Optional[int] = None) -> dict:
+        """Eventos 'X' (completos) com ts/dur em µs; tid = nome do thread."""
+        events = []
+        tids: Dict[str, int] = {}
+        for root in self.recent(n):
+            for sp in root.walk():
+                tid = tids.setdefault(sp.thread, len(tids) + 1)
+                args = {k: v for k, v in (("rows_in", sp.rows_in), ("rows_out", sp.rows_out),
+                                          ("mem_peak_kb", sp.mem_peak_kb), ("error", sp.error)) if v is not None}
+                args.update(sp.attrs)
+                events.append({"name": sp.name, "cat": root.name, "ph": "X", "pid": 1, "tid": tid,
+                               "ts": round((sp.start - self.epoch) * 1e6, 1),
+                               "dur": round(sp.duration_ms * 1000, 1), "args": args})
+        meta = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                for name, tid in tids.items()]
+        return {"traceEvents": meta + events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str, fmt: str = "json", n: Optional[int] = None):
+        data = self.to_chrome_trace(n) if fmt == "chrome" else self.to_json(n)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=None if fmt == "chrome" else 2)
+
+def format_tree(sp: Span, indent: int = 0) -> str:
+    """Uma linha por span: nome, ms, linhas entrada→saída e pico de memória."""
+    rows = ""
+    if sp.rows_in is not None or sp.rows_out is not None:
+        rows = f"  {'' if sp.rows_in is None else f'{sp.rows_in:,}'}→{'' if sp.rows_out is None else f'{sp.rows_out:,}'}"
+    mem = "" if sp.mem_peak_kb is None else f"  mem+{sp.mem_peak_kb:,.0f} KB"
+    extra = "".join(f"  {k}={v}" for k, v in sp.attrs.items())
+    err = f"  ERRO {sp.error}" if sp.error else ""
+    lines = [f"{'  ' * indent}{sp.name:<{max(1, 24 - 2 * indent)}} {sp.duration_ms:9.2f} ms{rows}{mem}{extra}{err}"]
+    for c in list(sp.children):
+        lines.append(format_tree(c, indent + 1))
+    return "\n".join(lines)
+
+TRACER = Tracer()
@@ -0,0 +1,179 @@
+# virtual_table.py
+# Tabela virtual sobre ttk.Treeview: o widget só tem as linhas visíveis; ao rolar,
+# os mesmos itens são reaproveitados com os valores da nova janela do resultado.
+# Memória no widget é constante e as células são formatadas sob demanda (com um pequeno cache).
+# A seleção e o cursor ficam guardados como índices do resultado (os iids do pool mudam de linha
+# ao rolar) e são reaplicados a cada desenho.
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+from tkinter import ttk
+
+class VirtualTable:
+    """
+    `data` pode ser qualquer sequência com __len__/__getitem__ (lista, view de índice…).
+    `formatter(item) -> tuple` gera os valores das colunas só para as linhas exibidas.
+    """
+    def __init__(self, tree: ttk.Treeview, scrollbar, formatter: Callable[[Any], Tuple],
+                 row_height: int = 28, buffer: int = 2, odd_even_tags: Tuple[str, str] = ("odd", "even")):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.formatter = formatter
+        self.row_height = row_height
+        self.buffer = buffer                      # janelas extras mantidas formatadas no cache
+        self.tags = odd_even_tags
+        self.data: Sequence[Any] = []
+        self.offset = 0
+        self._rows = 0
+        self._pool: list = []                     # ids dos itens reaproveitados do Treeview
+        self._detached: set = set()
+        self._fmt: "OrderedDict[int, Tuple]" = OrderedDict()
+        self._selected: Set[int] = set()          # índices do resultado, não iids
+        self.cursor: Optional[int] = None         # linha com o foco (setas movem este índice)
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand="")
+        tree.bind("<Configure>", lambda e: self._resize(e.height))
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        tree.bind("<Up>", lambda e: self._key(-1))
+        tree.bind("<Down>", lambda e: self._key(1))
+        tree.bind("<Prior>", lambda e: self._key(-self._rows))
+        tree.bind("<Next>", lambda e: self._key(self._rows))
+        tree.bind("<Home>", lambda e: self._key(-len(self.data)))
+        tree.bind("<End>", lambda e: self._key(len(self.data)))
+        tree.bind("<Button-1>", self._on_click, add="+")
+        tree.bind("<<TreeviewSelect>>", lambda e: self._sync_selection())
+
+    # ---------- dados ----------
+    def set_data(self, data: Sequence[Any]):
+        self.data = data
+        self.offset = 0
+        self._fmt.clear()
+        self._selected.clear()
+        self.cursor = None
+        self._render()
+
+    def __len__(self):
+        return len(self.data)
+
+    def selected_indices(self) -> List[int]:
+        """Índices (no resultado) das linhas selecionadas, inclusive as que rolaram para fora da tela."""
+        return sorted(self._selected)
+
+    def _visible(self):
+        """Pares (iid, índice no resultado) das linhas exibidas."""
+        n = len(self.data)
+        return [(iid, self.offset + i) for i, iid in enumerate(self._pool) if self.offset + i < n]
+
+    def _sync_selection(self):
+        """Clique/Ctrl+clique no Treeview: traduz os iids selecionados da janela atual para índices."""
+        sel = set(self.tree.selection())
+        for iid, idx in self._visible():
+            if iid in sel:
+                self._selected.add(idx)
+            else:
+                self._selected.discard(idx)
+
+    def _on_click(self, e):
+        iid = self.tree.identify_row(e.y)
+        if iid in self._pool and self.offset + self._pool.index(iid) < len(self.data):
+            self.cursor = self.offset + self._pool.index(iid)
+
+    # ---------- rolagem ----------
+    def _max_offset(self) -> int:
+        return max(0, len(self.data) - self._rows)
+
+    def scroll_to(self, offset: int):
+        offset = min(max(0, int(offset)), self._max_offset())
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def scroll(self, rows: int):
+        self.scroll_to(self.offset + rows)
+
+    def yview(self, *args):
+        """Comando da scrollbar: ('moveto', fração) ou ('scroll', n, 'units'|'pages')."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.data)))
+        elif args[0] == "scroll":
+            n = int(args[1])
+            self.scroll(n * self._rows if args[2] == "pages" else n)
+
+    def _on_wheel(self, e):
+        step = -1 if e.delta > 0 else 1
+        self.scroll(step * max(1, abs(e.delta) // 120) * 3)
+        return "break"
+
+    def _key(self, rows: int):
+        """Setas/PgUp/PgDn/Home/End movem o cursor (e a seleção); a janela só rola se ele sair dela."""
+        n = len(self.data)
+        if not n:
+            return "break"
+        base = self.cursor if self.cursor is not None else self.offset - (rows > 0)   # 1ª seta: 1ª linha visível
+        cur = min(max(0, base + rows), n - 1)
+        self.cursor = cur
+        self._selected = {cur}
+        if cur < self.offset:
+            self.offset = cur
+        elif cur >= self.offset + self._rows:
+            self.offset = min(cur - self._rows + 1, self._max_offset())
+        self._render()
+        return "break"
+
+    # ---------- desenho ----------
+    def _resize(self, height: int):
+        rows = max(1, (height - self.row_height) // self.row_height)   # desconta o cabeçalho
+        if rows != self._rows:
+            self._rows = rows
+            self.offset = min(self.offset, self._max_offset())
+            self._render()
+
+    def _cell(self, idx: int) -> Tuple:
+        vals = self._fmt.get(idx)
+        if vals is None:
+            vals = self._fmt[idx] = self.formatter(self.data[idx])
+            while len(self._fmt) > self._rows * (1 + 2 * self.buffer) + 1:
+                self._fmt.popitem(last=False)
+        else:
+            self._fmt.move_to_end(idx)
+        return vals
+
+    def _render(self):
+        rows = self._rows or 1
+        while len(self._pool) < rows:
+            self._pool.append(self.tree.insert("", "end", values=()))
+        while len(self._pool) > rows:
+            iid = self._pool.pop()
+            self._detached.discard(iid)
+            self.tree.delete(iid)
+        n = len(self.data)
+        for i, iid in enumerate(self._pool):
+            idx = self.offset + i
+            if idx < n:
+                if iid in self._detached:
+                    self.tree.move(iid, "", i)
+                    self._detached.discard(iid)
+                self.tree.item(iid, values=self._cell(idx), tags=(self.tags[idx % 2],))
+            elif iid not in self._detached:
+                self.tree.detach(iid)
+                self._detached.add(iid)
+        # seleção/foco guardados por índice → iids que mostram essas linhas agora
+        visible = self._visible()
+        sel = tuple(iid for iid, idx in visible if idx in self._selected)
+        if set(sel) != set(self.tree.selection()):
+            self.tree.selection_set(sel)
+        focus = next((iid for iid, idx in visible if idx == self.cursor), None)
+        if focus is not None and focus != self.tree.focus():
+            self.tree.focus(focus)
+        # pré-formata a janela seguinte (buffer) para rolagem suave
+        for idx in range(self.offset + rows, min(n, self.offset + rows * (1 + self.buffer))):
+            if idx not in self._fmt:
+                self._cell(idx)
+        if n:
+            self.scrollbar.set(self.offset / n, min(1.0, (self.offset + rows) / n))
+        else:
+            self.scrollbar.set(0.0, 1.0)